@@ -0,0 +1,140 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+
+from crossword import Crossword, WordTable
+from generate import BitsetCrosswordCreator
+
+# Word tables loaded by this worker process, by words file
+TABLES = dict()
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description="Generate a batch of crosswords from a JSONL manifest."
+    )
+    parser.add_argument(
+        "manifest",
+        help="JSONL file with one job per line: "
+             '{"structure": ..., "words": ..., "output": ...}'
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="number of worker processes (default: one per core)"
+    )
+    parser.add_argument(
+        "--render", action="store_true",
+        help="save each solved puzzle to the job's output image"
+    )
+    parser.add_argument(
+        "--results", default=None,
+        help="file to write JSONL results to (default: standard output)"
+    )
+    args = parser.parse_args()
+
+    out = open(args.results, "w") if args.results else sys.stdout
+    try:
+        for result in run_batch(args.manifest, args.workers, args.render):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def read_manifest(manifest):
+    """
+    Yield (line number, line) for each job in a JSONL manifest, skipping
+    blank lines. Lines are parsed by the worker solving them, so a
+    malformed line becomes an error result instead of ending the batch.
+    """
+    with open(manifest) as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                yield number, line
+
+
+def run_batch(manifest, workers=None, render=False):
+    """
+    Solve every job of `manifest` across a pool of `workers` processes,
+    yielding one result dict per job as soon as it is done.
+    """
+    jobs = ((number, line, render) for number, line in read_manifest(manifest))
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(solve_job, jobs)
+
+
+def load_table(words_file):
+    """
+    Return the WordTable of `words_file`, loading it only the first time
+    this worker process needs it.
+    """
+    if words_file not in TABLES:
+        TABLES[words_file] = WordTable.load(words_file, lengths=())
+    return TABLES[words_file]
+
+
+def solve_job(item):
+    """
+    Parse and solve one manifest line in a worker process.
+    Return a result dict with the job, its status ("solved", "unsolvable"
+    or "error"), timings, and the filled grid if solved.
+    """
+    number, line, render = item
+    result = {"line": number}
+    start = time.perf_counter()
+    try:
+        job = json.loads(line)
+        if not isinstance(job, dict):
+            raise ValueError("job must be a JSON object")
+        result.update(job)
+        result["line"] = number
+        cached = job["words"] in TABLES
+        table = load_table(job["words"])
+        crossword = Crossword(job["structure"], job["words"], table=table)
+        loaded = time.perf_counter()
+
+        creator = BitsetCrosswordCreator(
+            crossword, **job.get("options", {"inference": "mac"})
+        )
+        assignment = creator.solve()
+        solved = time.perf_counter()
+
+        result["dictionary_cached"] = cached
+        result["load_seconds"] = loaded - start
+        result["solve_seconds"] = solved - loaded
+        if assignment is None:
+            result["status"] = "unsolvable"
+        else:
+            result["status"] = "solved"
+            result["grid"] = grid_rows(creator, assignment)
+            if render and job.get("output"):
+                creator.save(assignment, job["output"])
+                result["render_seconds"] = time.perf_counter() - solved
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def grid_rows(creator, assignment):
+    """
+    Return the filled grid as a list of strings, with "#" for blocks.
+    """
+    letters = creator.letter_grid(assignment)
+    return [
+        "".join(
+            (letters[i][j] or " ") if creator.crossword.structure[i][j] else "#"
+            for j in range(creator.crossword.width)
+        )
+        for i in range(creator.crossword.height)
+    ]
+
+
+if __name__ == "__main__":
+    main()
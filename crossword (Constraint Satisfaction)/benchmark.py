@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+from crossword import Crossword
+from generate import CrosswordCreator, ENGINES, SearchInterrupted
+
+# Timed phases, in the order they run
+PHASES = ("crossword", "node_consistency", "ac3", "backtrack")
+
+LETTERS = "ETAOINSHRDLCUMWFGYPBVKJXQZ"
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description="Benchmark the crossword solver on synthetic inputs."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[5, 7, 9],
+        help="side lengths of the square grids"
+    )
+    parser.add_argument(
+        "--densities", type=float, nargs="+", default=[0.15, 0.3],
+        help="fractions of black squares"
+    )
+    parser.add_argument(
+        "--words", type=int, nargs="+", default=[2000, 10000],
+        help="dictionary sizes"
+    )
+    parser.add_argument(
+        "--seeds", type=int, default=3,
+        help="number of seeded structures per size and density"
+    )
+    parser.add_argument(
+        "--engines", nargs="+", default=list(ENGINES), choices=ENGINES
+    )
+    parser.add_argument(
+        "--inference", default="mac",
+        choices=[str(i) for i in CrosswordCreator.INFERENCES]
+    )
+    parser.add_argument(
+        "--node-limit", type=int, default=20000,
+        help="search nodes after which backtrack is cut off"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="runs per case; the fastest time of each phase is kept"
+    )
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument(
+        "--compare", metavar="BASELINE",
+        help="compare with results previously written by --output"
+    )
+    args = parser.parse_args()
+    inference = None if args.inference == "None" else args.inference
+
+    results = run_suite(
+        args.sizes, args.densities, args.words, args.seeds, args.engines,
+        inference, args.node_limit, args.repeat
+    )
+    report = dict(
+        commit=git_commit(),
+        python=platform.python_version(),
+        machine=platform.machine(),
+        results=results
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+    else:
+        print_results(results)
+
+
+def run_suite(sizes, densities, word_counts, seeds, engines, inference,
+              node_limit, repeat):
+    """
+    Benchmark every combination of grid size, density, dictionary size,
+    seed and engine. Return a list of result dicts, one per case.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for count in word_counts:
+            words_file = os.path.join(directory, f"words{count}.txt")
+            write_lines(
+                words_file, generate_dictionary(random.Random(count), count)
+            )
+            for size in sizes:
+                for density in densities:
+                    for seed in range(seeds):
+                        structure_file = os.path.join(
+                            directory, f"structure{size}-{density}-{seed}.txt"
+                        )
+                        rng = random.Random(f"{size}-{density}-{seed}")
+                        write_lines(
+                            structure_file,
+                            generate_structure(rng, size, size, density)
+                        )
+                        for engine in engines:
+                            case = dict(
+                                case=f"{size}x{size}-d{density}-w{count}"
+                                     f"-s{seed}-{engine}-{inference}",
+                                size=size, density=density, words=count,
+                                seed=seed, engine=engine,
+                                inference=inference
+                            )
+                            case.update(time_case(
+                                structure_file, words_file, ENGINES[engine],
+                                inference, node_limit, repeat
+                            ))
+                            results.append(case)
+    return results
+
+
+def time_case(structure_file, words_file, cls, inference, node_limit,
+              repeat):
+    """
+    Solve one case `repeat` times, timing each phase separately.
+    Return the fastest time of each phase, and the outcome of search.
+    """
+    best = {phase: float("inf") for phase in PHASES}
+    for _ in range(repeat):
+        times = dict()
+
+        # Loading includes any index the engine builds over the vocabulary
+        start = time.perf_counter()
+        crossword = Crossword(structure_file, words_file)
+        creator = cls(crossword, inference=inference)
+        times["crossword"] = time.perf_counter() - start
+        creator.node_limit = node_limit
+
+        start = time.perf_counter()
+        creator.enforce_node_consistency()
+        times["node_consistency"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        consistent = creator.ac3()
+        times["ac3"] = time.perf_counter() - start
+        creator.trail = []
+
+        start = time.perf_counter()
+        if not consistent:
+            status = "unsolvable"
+        else:
+            try:
+                assignment = creator.backtrack(dict())
+                status = "unsolvable" if assignment is None else "solved"
+            except SearchInterrupted:
+                status = "cutoff"
+        times["backtrack"] = time.perf_counter() - start
+
+        for phase, seconds in times.items():
+            best[phase] = min(best[phase], seconds)
+
+    result = {f"{phase}_seconds": best[phase] for phase in PHASES}
+    result.update(
+        variables=len(crossword.variables), status=status,
+        nodes=creator.nodes
+    )
+    return result
+
+
+def generate_structure(rng, height, width, density):
+    """
+    Return the rows of a crossword structure with about `density` of its
+    squares black, placed at random with 180-degree rotational symmetry,
+    as in published grids.
+    """
+    grid = [["_"] * width for _ in range(height)]
+    for i in range(height):
+        for j in range(width):
+            mirror = (height - 1 - i, width - 1 - j)
+            if (i, j) <= mirror and rng.random() < density:
+                grid[i][j] = "#"
+                grid[mirror[0]][mirror[1]] = "#"
+    return ["".join(row) for row in grid]
+
+
+def generate_dictionary(rng, size, min_length=2, max_length=15,
+                        exponent=1.0):
+    """
+    Return `size` distinct random words whose letters follow a Zipf-like
+    distribution: the kth most common English letter is drawn with weight
+    1 / k ** `exponent`. Word lengths are spread evenly over
+    `min_length` to `max_length`.
+    """
+    weights = [1 / (k ** exponent) for k in range(1, len(LETTERS) + 1)]
+    lengths = range(min_length, max_length + 1)
+
+    words = set()
+    while len(words) < size:
+        length = rng.choice(lengths)
+        words.add("".join(rng.choices(LETTERS, weights, k=length)))
+    return sorted(words)
+
+
+def write_lines(filename, lines):
+    with open(filename, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def git_commit():
+    """Return the commit being benchmarked, or None outside a git tree."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    """Print one line per case, with the time of each phase."""
+    print(f"{'case':<36}" + "".join(f"{phase:>18}" for phase in PHASES)
+          + f"{'status':>12}{'nodes':>8}")
+    for result in results:
+        print(f"{result['case']:<36}" + "".join(
+            f"{result[f'{phase}_seconds']:>18.4f}" for phase in PHASES
+        ) + f"{result['status']:>12}{result['nodes']:>8}")
+
+
+def compare(baseline, report):
+    """
+    Print, for each case in both reports, the time of each phase relative
+    to the baseline: below 1 is faster, above 1 is slower.
+    """
+    before = {result["case"]: result for result in baseline["results"]}
+    print(f"{baseline['commit']} -> {report['commit']}")
+    print(f"{'case':<36}" + "".join(f"{phase:>18}" for phase in PHASES))
+    totals = {phase: [0.0, 0.0] for phase in PHASES}
+    for result in report["results"]:
+        old = before.get(result["case"])
+        if old is None:
+            continue
+        ratios = []
+        for phase in PHASES:
+            key = f"{phase}_seconds"
+            totals[phase][0] += old[key]
+            totals[phase][1] += result[key]
+            ratios.append(ratio(old[key], result[key]))
+        print(f"{result['case']:<36}" + "".join(
+            f"{r:>18.2f}" for r in ratios
+        ))
+    print(f"{'total':<36}" + "".join(
+        f"{ratio(*totals[phase]):>18.2f}" for phase in PHASES
+    ))
+
+
+def ratio(old, new):
+    return new / old if old else float("nan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import sys
+
+from crossword import WordTable
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python compile_words.py words output")
+
+    # Compile the word list into a dictionary the solver can memory-map
+    table = WordTable.load(sys.argv[1])
+    table.save(sys.argv[2])
+    print(f"Compiled {len(table.words)} words into {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,17 @@
+import bisect
+import copy
+import mmap
+import struct
+
+# Compiled dictionary format, see WordTable.save
+COMPILED_MAGIC = b"XWDT"
+COMPILED_VERSION = 1
+COMPILED_HEADER = struct.Struct("<4sII")
+COMPILED_COUNT = struct.Struct("<I")
+COMPILED_BUCKET = struct.Struct("<IIQQI")
+COMPILED_ENTRY = struct.Struct("<II")
+
+
 class Variable():
 
     ACROSS = "across"
@@ -37,7 +51,16 @@ class Variable():
 
 class Crossword():
 
-    def __init__(self, structure_file, words_file):
+    def __init__(self, structure_file, words_file, table=None):
+        """
+        Load a crossword structure and vocabulary. If `table` is given, it
+        is a WordTable already loaded from `words_file`, which is reused
+        instead of reading the file again. `words_file` may be a word list
+        or a dictionary compiled with compile_words.py.
+        """
+
+        self.structure_file = structure_file
+        self.words_file = words_file
 
         # Determine structure of crossword
         with open(structure_file) as f:
@@ -57,11 +80,6 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
-        # print(self.words)
-
         # Determine variable set
         self.variables = set()
         for i in range(self.height):
@@ -105,35 +123,574 @@ class Crossword():
                             length=length
                         ))
 
+        # Load vocabulary, bucketed once so domains can refer to words by
+        # id, with the buckets of every slot length in the grid at hand
+        lengths = {var.length for var in self.variables}
+        if table is None:
+            table = WordTable.load(words_file, lengths=lengths)
+        else:
+            table.load_lengths(lengths)
+        self.table = table
+
+        # Index cells, so that cell_slots[i][j] lists every (variable, k)
+        # such that the variable's kth character is at cell (i, j)
+        self.cell_slots = [
+            [[] for _ in range(self.width)]
+            for _ in range(self.height)
+        ]
+        for var in self.variables:
+            for k, (i, j) in enumerate(var.cells):
+                self.cell_slots[i][j].append((var, k))
+
         # Compute overlaps for each word
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # Only overlapping pairs share a cell, so only those are stored
+        self.overlaps = Overlaps()
+        for row in self.cell_slots:
+            for slots in row:
+                for v1, k1 in slots:
+                    for v2, k2 in slots:
+                        if v1 != v2:
+                            self.overlaps[v1, v2] = (k1, k2)
 
         ### stuff                    
         # for key, value in self.overlaps.items():
         #     print(key,":", value, "//////")
-       
+
+        # Cache neighbors of each variable, in a fixed order
+        adjacency = {var: [] for var in self.variables}
+        for v1, v2 in self.overlaps:
+            adjacency[v1].append(v2)
+        self.adjacency = {
+            var: tuple(sorted(
+                neighbors,
+                key=lambda v: (v.i, v.j, v.direction)
+            ))
+            for var, neighbors in adjacency.items()
+        }
+
+        # Groups of variables connected by overlaps, which share no
+        # constraint with each other besides distinct words
+        self.components = self.connected_components()
+
+    def connected_components(self):
+        """
+        Return the connected components of the overlap graph, as a list of
+        frozensets of variables, in a fixed order: largest first, then by
+        their first slot.
+        """
+        order = lambda var: (var.i, var.j, var.direction)
+        components = []
+        seen = set()
+        for start in sorted(self.variables, key=order):
+            if start in seen:
+                continue
+            seen.add(start)
+            component = [start]
+            frontier = [start]
+            while frontier:
+                for neighbor in self.adjacency[frontier.pop()]:
+                    if neighbor not in seen:
+                        seen.add(neighbor)
+                        component.append(neighbor)
+                        frontier.append(neighbor)
+            components.append(frozenset(component))
+        components.sort(key=lambda c: (-len(c), min(map(order, c))))
+        return components
+
+    def restrict(self, variables):
+        """
+        Return a copy of the crossword in which only `variables` are slots,
+        such as one of `self.components`. Overlaps with other variables are
+        dropped; structure and vocabulary are shared.
+        """
+        crossword = copy.copy(self)
+        crossword.variables = set(variables)
+        crossword.overlaps = Overlaps({
+            (v1, v2): overlap
+            for (v1, v2), overlap in self.overlaps.items()
+            if v1 in crossword.variables and v2 in crossword.variables
+        })
+        crossword.cell_slots = [
+            [
+                [(var, k) for var, k in slots if var in crossword.variables]
+                for slots in row
+            ]
+            for row in self.cell_slots
+        ]
+        crossword.adjacency = {
+            var: tuple(
+                neighbor for neighbor in self.adjacency[var]
+                if neighbor in crossword.variables
+            )
+            for var in crossword.variables
+        }
+        crossword.components = crossword.connected_components()
+        return crossword
+
+    @property
+    def words(self):
+        """Vocabulary list, as a set of words."""
+        return self.table.words
 
     def neighbors(self, var):
-        """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
+        """Given a variable, return tuple of overlapping variables."""
+        return self.adjacency[var]
+
+
+class Overlaps(dict):
+    """
+    Overlaps of overlapping variable pairs. Pairs that do not overlap
+    are not stored, and look up as None.
+    """
+
+    def __missing__(self, key):
+        return None
+
+
+class WordTable():
+
+    def __init__(self, words):
+        """
+        Store a vocabulary once, bucketed by word length.
+        Within its bucket every word has an integer id, so any set of
+        words of one length can be represented as a bitmask of ids.
+
+        Buckets are indexed on demand by `index_lengths`, as only the
+        bitset solver reads the index: `index[length, position, letter]`
+        is the bitmask of words with `letter` at `position`, and
+        `letters[length, position]` lists the letters that occur there.
+        """
+        self.words = words
+        self.buckets = dict()
+        for word in sorted(words):
+            self.buckets.setdefault(len(word), []).append(word)
+
+        self.ids = dict()
+        for bucket in self.buckets.values():
+            for i, word in enumerate(bucket):
+                self.ids[word] = i
+
+        self.index = dict()
+        self.letters = dict()
+        self.indexed = set()
+
+        # Letters of the vocabulary, each with a small integer code
+        self.alphabet = "".join(sorted(set("".join(self.ids))))
+        self.codes = {letter: i for i, letter in enumerate(self.alphabet)}
+        self.matrices = dict()
+
+    @classmethod
+    def load(cls, words_file, lengths=None):
+        """
+        Return a WordTable of the vocabulary in `words_file`, one word
+        per line. If `words_file` is a compiled dictionary, return a
+        CompiledWordTable of it instead, with the buckets whose length is
+        in `lengths` loaded (or every bucket, if `lengths` is None).
+        """
+        if CompiledWordTable.is_compiled(words_file):
+            return CompiledWordTable(words_file, lengths=lengths)
+        with open(words_file) as f:
+            return cls(set(f.read().upper().splitlines()))
+
+    def load_lengths(self, lengths):
+        """
+        Make the buckets of every length in `lengths` available. Every
+        bucket of a word list is in memory already.
+        """
+
+    def index_lengths(self, lengths):
+        """Index every length in `lengths` that is not indexed yet."""
+        for length in lengths:
+            if length not in self.indexed:
+                self.index_bucket(length)
+                self.indexed.add(length)
+
+    def index_bucket(self, length):
+        """Add the (length, position, letter) index entries of a bucket."""
+        bucket = self.buckets.get(length, [])
+        for position in range(length):
+            ids = dict()
+            for i, word in enumerate(bucket):
+                ids.setdefault(word[position], []).append(i)
+            self.letters[length, position] = tuple(sorted(ids))
+            for letter, letter_ids in ids.items():
+                self.index[length, position, letter] = ids_to_mask(
+                    letter_ids, len(bucket)
+                )
+
+    def encoded(self, length):
+        """
+        Return the bucket of the given length as a NumPy matrix of letter
+        codes, with one row per word id. Built on first use.
+        """
+        if length not in self.matrices:
+            import numpy as np
+            bucket = self.buckets.get(length, [])
+            points = np.frombuffer(
+                "".join(bucket).encode("utf-32-le"), dtype=np.uint32
+            )
+            alphabet = np.array([ord(c) for c in self.alphabet], dtype=np.uint32)
+            self.matrices[length] = np.searchsorted(alphabet, points).reshape(
+                len(bucket), length
+            )
+        return self.matrices[length]
+
+    def full_mask(self, length):
+        """Return the bitmask of every word of the given length."""
+        return (1 << len(self.buckets.get(length, ()))) - 1
+
+    def domain(self, length, mask=None):
+        """
+        Return a WordBitset of words of the given length.
+        If `mask` is None, the set contains every word of that length.
+        """
+        if mask is None:
+            mask = self.full_mask(length)
+        return WordBitset(self.buckets.get(length, []), self.ids, mask)
+
+    def save(self, path):
+        """
+        Write the vocabulary to `path` as a compiled dictionary, which
+        CompiledWordTable memory-maps instead of parsing. Every bucket is
+        indexed first, so the compiled file serves any structure.
+
+        Layout, all integers little-endian:
+            header     magic, version, alphabet size, alphabet (UTF-8),
+                       and number of buckets
+            directory  per bucket: length, word count, offset of its words,
+                       offset of its index, and number of index entries
+            words      per bucket: one fixed-width row of letter codes
+                       per word id, in sorted order
+            index      per bucket: (position, letter code) followed by
+                       the mask of that index entry, ceil(count / 8) bytes
+        """
+        if len(self.alphabet) > 256:
+            raise ValueError("alphabet too large to compile")
+        self.index_lengths(self.buckets)
+        alphabet = self.alphabet.encode("utf-8")
+        lengths = sorted(self.buckets)
+
+        with open(path, "wb") as f:
+            f.write(COMPILED_HEADER.pack(
+                COMPILED_MAGIC, COMPILED_VERSION, len(alphabet)
+            ))
+            f.write(alphabet)
+            f.write(COMPILED_COUNT.pack(len(lengths)))
+
+            # Directory is written last, once offsets are known
+            directory = f.tell()
+            f.seek(COMPILED_BUCKET.size * len(lengths), 1)
+
+            entries = []
+            for length in lengths:
+                bucket = self.buckets[length]
+                words_offset = f.tell()
+                for word in bucket:
+                    f.write(bytes(self.codes[letter] for letter in word))
+
+                index_offset = f.tell()
+                size = (len(bucket) + 7) // 8
+                count = 0
+                for position in range(length):
+                    for letter in self.letters[length, position]:
+                        f.write(COMPILED_ENTRY.pack(
+                            position, self.codes[letter]
+                        ))
+                        f.write(self.index[length, position, letter].to_bytes(
+                            size, "little"
+                        ))
+                        count += 1
+                entries.append(COMPILED_BUCKET.pack(
+                    length, len(bucket), words_offset, index_offset, count
+                ))
+
+            f.seek(directory)
+            f.write(b"".join(entries))
+
+
+class CompiledWordTable(WordTable):
+
+    def __init__(self, path, lengths=None):
+        """
+        Memory-map a dictionary compiled by WordTable.save. Only the
+        directory is read up front; the words and index of a bucket are
+        read when its length is indexed, so a structure only touches the
+        pages of the lengths it has slots for.
+
+        Words of a bucket are decoded from the map on access, and word ids
+        are found by binary search, since buckets are sorted.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, size = COMPILED_HEADER.unpack_from(self.map, 0)
+        if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+            raise ValueError(f"{path} is not a compiled dictionary")
+        offset = COMPILED_HEADER.size
+        self.alphabet = self.map[offset:offset + size].decode("utf-8")
+        self.codes = {letter: i for i, letter in enumerate(self.alphabet)}
+        offset += size
+
+        self.directory = dict()
+        count, = COMPILED_COUNT.unpack_from(self.map, offset)
+        offset += COMPILED_COUNT.size
+        for _ in range(count):
+            entry = COMPILED_BUCKET.unpack_from(self.map, offset)
+            self.directory[entry[0]] = entry[1:]
+            offset += COMPILED_BUCKET.size
+
+        self.buckets = dict()
+        self.ids = CompiledIds(self.buckets)
+        self.index = dict()
+        self.letters = dict()
+        self.indexed = set()
+        self.matrices = dict()
+        self.vocabulary = None
+        self.index_lengths(self.directory if lengths is None else lengths)
+
+    def load_lengths(self, lengths):
+        """
+        Map the buckets of every length in `lengths`, with their index,
+        which is read along with them.
+        """
+        self.index_lengths(lengths)
+
+    @staticmethod
+    def is_compiled(path):
+        """Return True if the file at `path` is a compiled dictionary."""
+        with open(path, "rb") as f:
+            return f.read(len(COMPILED_MAGIC)) == COMPILED_MAGIC
+
+    @property
+    def words(self):
+        """
+        Set of every word in the indexed buckets, decoded on first use.
+        Only the set-based solver needs it.
+        """
+        if self.vocabulary is None:
+            self.vocabulary = set()
+            for length in self.indexed:
+                self.vocabulary.update(self.buckets[length])
+        return self.vocabulary
+
+    def index_bucket(self, length):
+        """Map a bucket, and read its precomputed index entries."""
+        count, words_offset, index_offset, entries = self.directory.get(
+            length, (0, 0, 0, 0)
+        )
+        self.buckets[length] = CompiledBucket(
+            self.map, words_offset, length, count, self.alphabet
+        )
+        self.vocabulary = None
+
+        letters = {position: [] for position in range(length)}
+        size = (count + 7) // 8
+        offset = index_offset
+        for _ in range(entries):
+            position, code = COMPILED_ENTRY.unpack_from(self.map, offset)
+            offset += COMPILED_ENTRY.size
+            letter = self.alphabet[code]
+            self.index[length, position, letter] = int.from_bytes(
+                self.map[offset:offset + size], "little"
+            )
+            letters[position].append(letter)
+            offset += size
+        for position, found in letters.items():
+            self.letters[length, position] = tuple(found)
+
+    def encoded(self, length):
+        """
+        Return the bucket of the given length as a NumPy matrix of letter
+        codes, viewed directly on the map rather than built.
+        """
+        if length not in self.matrices:
+            import numpy as np
+            bucket = self.buckets[length]
+            self.matrices[length] = np.frombuffer(
+                self.map, dtype=np.uint8,
+                count=len(bucket) * length, offset=bucket.offset
+            ).reshape(len(bucket), length)
+        return self.matrices[length]
+
+
+class CompiledBucket():
+    """
+    Sorted bucket of same-length words in a compiled dictionary, decoded
+    from the map one word at a time.
+    """
+
+    __slots__ = ("map", "offset", "length", "count", "alphabet")
+
+    def __init__(self, map, offset, length, count, alphabet):
+        self.map = map
+        self.offset = offset
+        self.length = length
+        self.count = count
+        self.alphabet = alphabet
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start = self.offset + i * self.length
+        return "".join(
+            map(self.alphabet.__getitem__, self.map[start:start + self.length])
+        )
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+
+class CompiledIds():
+    """
+    Word-to-id lookup over the buckets of a CompiledWordTable, by binary
+    search in the bucket of the word's length.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+
+    def get(self, word, default=None):
+        bucket = self.buckets.get(len(word))
+        if bucket is None:
+            return default
+        i = bisect.bisect_left(bucket, word)
+        if i < len(bucket) and bucket[i] == word:
+            return i
+        return default
+
+    def __getitem__(self, word):
+        i = self.get(word)
+        if i is None:
+            raise KeyError(word)
+        return i
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+
+class WordBitset():
+    """
+    Set of same-length words from a WordTable, stored as a bitmask of ids.
+    Supports the parts of the `set` interface the solver relies on, so it
+    can be used as a drop-in variable domain.
+    """
+
+    __slots__ = ("words", "ids", "mask")
+
+    def __init__(self, words, ids, mask=0):
+        self.words = words
+        self.ids = ids
+        self.mask = mask
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __iter__(self):
+        # Reversed binary string, so that character i is the bit of id i
+        bits = bin(self.mask)[:1:-1]
+        i = bits.find("1")
+        while i != -1:
+            yield self.words[i]
+            i = bits.find("1", i + 1)
+
+    def __contains__(self, word):
+        i = self._id(word)
+        return i is not None and (self.mask >> i) & 1 == 1
+
+    def __eq__(self, other):
+        if isinstance(other, WordBitset):
+            return self.words is other.words and self.mask == other.mask
+        return set(self) == other
+
+    def __repr__(self):
+        return f"WordBitset({set(self)})"
+
+    def __and__(self, other):
+        return self._new(self.mask & self._mask(other))
+
+    def __or__(self, other):
+        return self._new(self.mask | self._mask(other))
+
+    def __sub__(self, other):
+        return self._new(self.mask & ~self._mask(other))
+
+    def copy(self):
+        return self._new(self.mask)
+
+    def add(self, word):
+        self.mask |= 1 << self._bit(word)
+
+    def remove(self, word):
+        if word not in self:
+            raise KeyError(word)
+        self.mask &= ~(1 << self._bit(word))
+
+    def discard(self, word):
+        if word in self:
+            self.mask &= ~(1 << self._bit(word))
+
+    def update(self, other):
+        self.mask |= self._mask(other)
+
+    def difference_update(self, other):
+        self.mask &= ~self._mask(other)
+
+    def intersection_update(self, other):
+        self.mask &= self._mask(other)
+
+    def _new(self, mask):
+        return WordBitset(self.words, self.ids, mask)
+
+    def _id(self, word):
+        """Return the id of `word` in this bucket, or None if absent."""
+        i = self.ids.get(word)
+        if i is None or i >= len(self.words) or self.words[i] != word:
+            return None
+        return i
+
+    def _bit(self, word):
+        i = self._id(word)
+        if i is None:
+            raise KeyError(word)
+        return i
+
+    def _mask(self, other):
+        """
+        Return `other` as a mask over this bucket: `other` may be another
+        WordBitset, a raw int mask, or an iterable of words.
+        """
+        if isinstance(other, WordBitset):
+            return other.mask
+        if isinstance(other, int):
+            return other
+
+        ids = (self._id(word) for word in other)
+        return ids_to_mask(
+            (i for i in ids if i is not None), len(self.words)
         )
+
+
+def ids_to_mask(ids, size):
+    """
+    Return the bitmask with the bits in `ids` set, for ids below `size`.
+    Built from a bit string, which is linear in `size`, rather than by
+    OR-ing one bit at a time, which is quadratic.
+    """
+    bits = bytearray(b"0" * size)
+    for i in ids:
+        bits[i] = ord("1")
+    bits.reverse()
+    return int(bits, 2) if bits else 0
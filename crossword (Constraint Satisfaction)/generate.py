@@ -1,23 +1,185 @@
-import sys
+import argparse
+import heapq
+import itertools
+import multiprocessing
+import os
+import random
+import render
+import time
 
 from crossword import Variable, Crossword
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
 from copy import deepcopy
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Domains left by node and arc consistency, keyed by
+# CrosswordCreator.snapshot_key, for warm starts; least recently used first
+SNAPSHOTS = OrderedDict()
+SNAPSHOT_LIMIT = 16
+
+
+class SolverStats():
+    """
+    Counters and per-phase wall times of a CrosswordCreator run.
+    """
+
+    COUNTERS = (
+        "revise_calls", "arcs", "wipeouts", "backtracks", "nodes", "max_depth"
+    )
+    PHASES = ("node_consistency", "ac3", "search")
+
+    def __init__(self):
+        self.revise_calls = 0
+        self.arcs = 0
+        self.wipeouts = 0
+        self.backtracks = 0
+        self.nodes = 0
+        self.max_depth = 0
+        self.times = {phase: 0.0 for phase in self.PHASES}
+
+    def as_dict(self):
+        """Return the counters and phase times as a flat dict."""
+        stats = {counter: getattr(self, counter) for counter in self.COUNTERS}
+        for phase, seconds in self.times.items():
+            stats[f"{phase}_seconds"] = seconds
+        return stats
+
+    def __repr__(self):
+        fields = ", ".join(
+            f"{key}={value:.4f}" if isinstance(value, float)
+            else f"{key}={value}"
+            for key, value in self.as_dict().items()
+        )
+        return f"SolverStats({fields})"
+
+
+class SearchInterrupted(Exception):
+    """
+    Raised when search is cut off by its node limit or interrupt check.
+    """
+
 
 class CrosswordCreator():
 
-    def __init__(self, crossword):
+    INFERENCES = (None, "forward", "mac")
+    CONSISTENCIES = ("ac3", "ac2001")
+    ORDERINGS = ("mrv", "domwdeg")
+
+    def __init__(self, crossword, inference=None, verify=False,
+                 consistency="ac3", ordering="mrv", backjumping=False,
+                 nogood_limit=10000, seed=None, alldiff=False):
         """
         Create new CSP crossword generate.
+        `inference` selects what is done after each assignment during
+        search: None (nothing), "forward" (forward checking) or "mac"
+        (maintaining arc consistency).
+        If `verify` is True, every incremental consistency check made
+        during search is checked against a full scan of the assignment.
+        `consistency` selects how arcs are revised: "ac3" rescans the
+        domains, "ac2001" resumes from the last support found per value.
+        `ordering` selects the variable ordering heuristic: "mrv" (minimum
+        remaining values, then highest degree) or "domwdeg" (smallest
+        ratio of domain size to weighted degree).
+        If `backjumping` is True, search uses conflict-directed backjumping
+        and caches up to `nogood_limit` partial assignments proven to have
+        no solution, evicting the least recently used.
+        If `seed` is given, ties in variable and value ordering are broken
+        by a random number generator seeded with it.
+        If `alldiff` is True, words are kept distinct by propagation as well:
+        whenever arc consistency holds, values that some group of slots of
+        the same length must use between them are pruned from the others.
         """
+        if inference not in self.INFERENCES:
+            raise ValueError(f"Unknown inference mode: {inference}")
+        if consistency not in self.CONSISTENCIES:
+            raise ValueError(f"Unknown consistency mode: {consistency}")
+        if ordering not in self.ORDERINGS:
+            raise ValueError(f"Unknown ordering: {ordering}")
         self.crossword = crossword
+        self.inference = inference
+        self.verify = verify
+        self.consistency = consistency
+        self.ordering = ordering
+        self.backjumping = backjumping
+        self.nogood_limit = nogood_limit
+        self.alldiff = alldiff
+        self.random = None if seed is None else random.Random(seed)
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.initial_domain(var)
             for var in self.crossword.variables
         }
         # for i, j in self.domains.items():
         #     print(i, j)
 
+        # Variables sharing a length, the only ones that could share a word
+        groups = dict()
+        for var in self.crossword.variables:
+            groups.setdefault(var.length, []).append(var)
+        self.groups = [group for group in groups.values() if len(group) > 1]
+
+        # Undo log of (variable, removed words), so pruning done during
+        # search can be reverted on backtrack without copying domains
+        self.trail = []
+
+        # Words used by the assignment being searched
+        self.used_words = set()
+
+        # AC-2001 state: a fixed order of the words of y with each letter at
+        # each position, and for each (x, letter, y) the position in that
+        # order of the letter's last support
+        self.orders = dict()
+        self.supports = dict()
+
+        # Constraint weights for dom/wdeg, bumped on each domain wipeout
+        self.weights = dict()
+
+        # Priority queue of unassigned variables used during search, as a
+        # heap of [priority, count, version, variable] entries; an entry
+        # is stale once its variable's version has moved on
+        self.queue = None
+        self.versions = dict()
+        self.counter = itertools.count()
+        self.assignment = None
+
+        # Backjumping state: the variables assigned so far in order, the
+        # assigned variable whose propagation made each recorded pruning,
+        # and the variable whose domain was last wiped out by propagation
+        self.path = []
+        self.depth = dict()
+        self.cause = None
+        self.causes = {var: [] for var in self.crossword.variables}
+        self.wiped = None
+
+        # Nogood cache: frozensets of (variable, word) pairs, in LRU order,
+        # indexed by each pair they contain
+        self.nogoods = OrderedDict()
+        self.nogood_index = dict()
+
+        # Search limits: search stops with SearchInterrupted after
+        # `node_limit` nodes, or once `interrupt()` returns True
+        self.node_limit = None
+        self.interrupt = None
+        self.nodes = 0
+
+        # Instrumentation, off unless `stats` is a SolverStats; then
+        # `progress(stats)` is called every `progress_every` nodes, if set
+        self.stats = None
+        self.progress = None
+        self.progress_every = 1000
+
+    def initial_domain(self, var):
+        """
+        Return the domain `var` starts with, before node consistency.
+        """
+        return self.crossword.words.copy()
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -49,56 +211,227 @@ class CrosswordCreator():
 
     def save(self, assignment, filename):
         """
-        Save crossword assignment to an image file.
+        Save crossword assignment to a file. If `filename` ends in .svg the
+        grid is written as an SVG image, if it ends in .txt as text, and
+        otherwise as an image rendered from glyphs cached across calls.
         """
-        from PIL import Image, ImageDraw, ImageFont
-        cell_size = 100
-        cell_border = 2
-        interior_size = cell_size - 2 * cell_border
         letters = self.letter_grid(assignment)
+        structure = self.crossword.structure
+        extension = os.path.splitext(filename)[1].lower()
+        if extension == ".svg":
+            content = render.svg(structure, letters)
+        elif extension == ".txt":
+            content = render.text(structure, letters)
+        else:
+            render.get_renderer().save(structure, letters, filename)
+            return
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def solve(self, fixed=None):
+        """
+        Enforce node and arc consistency, and then solve the CSP.
+
+        If `fixed` is given, it maps variables to words from the vocabulary
+        that are pinned in place, and the solution extends it. The domains
+        left by node and arc consistency are then taken from a snapshot
+        cached per structure and dictionary, computed on first use, and
+        only the pruning caused by the pinned words is propagated.
+        """
+        if fixed is None:
+            if not self.preprocess():
+                return None
+            return self.backtrack(dict())
+
+        if not self.restore_snapshot():
+            return None
+        assignment = dict(fixed)
+        if (not set(assignment) <= self.crossword.variables
+                or not self.consistent(assignment)):
+            return None
+
+        # Pin each word, then propagate from the pinned variables only. The
+        # pruning stays on the trail, and is undone once search is over, so
+        # the pins do not outlive this call; neither do nogoods learned
+        # under them, which leave them out
+        try:
+            for var, word in assignment.items():
+                domain = self.domains[var]
+                if word not in domain:
+                    return None
+                removed = domain - {word}
+                if removed:
+                    self.prune(var, removed)
+            with self.phase("ac3"):
+                consistent = self.ac3([
+                    (neighbor, var)
+                    for var in assignment
+                    for neighbor in self.crossword.neighbors(var)
+                    if neighbor not in assignment
+                ])
+            if not consistent:
+                return None
+            return self.backtrack(assignment)
+        finally:
+            self.undo(0)
+            self.clear_nogoods()
+
+    def solve_with_stats(self, fixed=None, progress=None, every=1000):
+        """
+        Like `solve`, but with instrumentation on for this run. Return
+        (assignment, stats), where stats is a SolverStats.
+        If `progress` is given, it is called with the stats every `every`
+        search nodes.
+        """
+        self.stats = SolverStats()
+        self.progress = progress
+        self.progress_every = every
+        try:
+            return self.solve(fixed), self.stats
+        finally:
+            self.stats = None
+            self.progress = None
+
+    @contextmanager
+    def phase(self, name):
+        """Add the wall time of the block to phase `name` of the stats."""
+        if self.stats is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stats.times[name] += time.perf_counter() - start
 
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.crossword.width * cell_size,
-             self.crossword.height * cell_size),
-            "black"
+    def snapshot_key(self):
+        """
+        Return the key of the snapshot of this CSP after node and arc
+        consistency: the engine, the structure and the variables of it
+        being solved, the dictionary file as last modified, and whether
+        all-different pruning is on.
+        """
+        words_file = os.path.abspath(self.crossword.words_file)
+        return (
+            type(self),
+            tuple(tuple(row) for row in self.crossword.structure),
+            frozenset(self.crossword.variables),
+            words_file,
+            os.stat(words_file).st_mtime_ns,
+            self.alldiff
         )
-        font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
-        draw = ImageDraw.Draw(img)
 
-        for i in range(self.crossword.height):
-            for j in range(self.crossword.width):
+    def restore_snapshot(self):
+        """
+        Set the domains to copies of those left by node and arc consistency,
+        taken from SNAPSHOTS, or computed and added to it if missing.
+        Return False if node and arc consistency leave some domain empty.
+        """
+        key = self.snapshot_key()
+        if key in SNAPSHOTS:
+            SNAPSHOTS.move_to_end(key)
+            snapshot = SNAPSHOTS[key]
+        else:
+            snapshot = None
+            if self.preprocess():
+                snapshot = {
+                    var: domain.copy() for var, domain in self.domains.items()
+                }
+            SNAPSHOTS[key] = snapshot
+            if len(SNAPSHOTS) > SNAPSHOT_LIMIT:
+                SNAPSHOTS.popitem(last=False)
+        if snapshot is None:
+            return False
 
-                rect = [
-                    (j * cell_size + cell_border,
-                     i * cell_size + cell_border),
-                    ((j + 1) * cell_size - cell_border,
-                     (i + 1) * cell_size - cell_border)
-                ]
-                if self.crossword.structure[i][j]:
-                    draw.rectangle(rect, fill="white")
-                    if letters[i][j]:
-                        # DeprecationWarning: textsize is deprecated and will be removed in Pillow 10 (2023-07-01). 
-                        # Use textbbox or textlength instead.
-                        # w, h = draw.textsize(letters[i][j], font=font)
-                        bbox = draw.textbbox((0, 0), letters[i][j], font=font)
-                        w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
-                        draw.text(
-                            (rect[0][0] + ((interior_size - w) / 2),
-                             rect[0][1] + ((interior_size - h) / 2) - 10),
-                            letters[i][j], fill="black", font=font
-                        )
-
-        img.save(filename)
-
-    def solve(self):
+        # Start from the snapshot, with no pruning to undo or explain
+        self.domains = {
+            var: domain.copy() for var, domain in snapshot.items()
+        }
+        self.trail = []
+        self.causes = {var: [] for var in self.crossword.variables}
+        self.orders = dict()
+        self.supports = dict()
+        self.clear_nogoods()
+        return True
+
+    def clear_nogoods(self):
+        """Empty the nogood cache."""
+        self.nogoods.clear()
+        self.nogood_index.clear()
+
+    def solve_components(self, workers=None):
         """
-        Enforce node and arc consistency, and then solve the CSP.
+        Solve each connected component of the crossword as its own CSP,
+        so that search cost adds up over components instead of multiplying.
+        If `workers` is given, components are solved in that many processes.
+
+        Components only constrain each other by requiring distinct words,
+        which is reconciled at the end: each component in turn keeps its
+        solution if it uses no word taken by the ones before, and otherwise
+        is solved again without those words. If that fails, the whole grid
+        is solved at once.
         """
-        self.enforce_node_consistency()
-        self.ac3()
-        return self.backtrack(dict())
+        components = self.crossword.components
+        if len(components) <= 1:
+            return self.solve()
+
+        options = dict(
+            inference=self.inference, verify=self.verify,
+            consistency=self.consistency, ordering=self.ordering,
+            backjumping=self.backjumping, nogood_limit=self.nogood_limit,
+            alldiff=self.alldiff
+        )
+        if workers:
+            with ProcessPoolExecutor(workers) as executor:
+                solutions = list(executor.map(
+                    component_worker,
+                    itertools.repeat(type(self)),
+                    itertools.repeat(self.crossword.structure_file),
+                    itertools.repeat(self.crossword.words_file),
+                    itertools.repeat(options),
+                    range(len(components))
+                ))
+        else:
+            solutions = [
+                solve_component(
+                    type(self), self.crossword.restrict(component), options
+                )
+                for component in components
+            ]
+
+        # A component with no solution leaves the whole grid without one
+        if any(solution is None for solution in solutions):
+            return None
+
+        assignment = dict()
+        taken = set()
+        for component, solution in zip(components, solutions):
+            if not taken.isdisjoint(solution.values()):
+                solution = solve_component(
+                    type(self), self.crossword.restrict(component), options,
+                    taken=taken
+                )
+                if solution is None:
+                    return self.solve()
+            assignment.update(solution)
+            taken.update(solution.values())
+        return assignment
+
+    def preprocess(self):
+        """
+        Enforce node and arc consistency before search.
+        Return False if some domain ends up empty, True otherwise.
+        """
+        with self.phase("node_consistency"):
+            self.enforce_node_consistency()
+        with self.phase("ac3"):
+            consistent = self.ac3()
+        if not consistent:
+            return False
+
+        # Pruning done before search holds for every assignment
+        self.trail = []
+        return True
     
     def enforce_node_consistency(self):
         """
@@ -139,11 +472,13 @@ class CrosswordCreator():
             y_chars.add(word[y_intersect])
 
         # Check if x's domain's words have a char that can fit
-        temp_xdomain = deepcopy(self.domains[x])
-        for word in temp_xdomain:
+        removed = set()
+        for word in self.domains[x]:
             if word[x_intersect] not in y_chars:
-                self.domains[x].remove(word)
+                removed.add(word)
                 revision = True
+        if revision:
+            self.prune(x, removed)
 
         # print("intersect", self.crossword.overlaps[x, y])    
         # print("new x", self.domains[x])
@@ -151,7 +486,80 @@ class CrosswordCreator():
         # print()
 
         return revision
-    
+
+    def revise_ac2001(self, x, y):
+        """
+        Make variable `x` arc consistent with variable `y`, AC-2001 style.
+        Every word of `x` with the same letter at the overlap has the same
+        supports, so the last support found is remembered per letter; a
+        re-check is free while that support is still in the domain of `y`,
+        and otherwise resumes the search from it instead of from the start.
+
+        Return True if a revision was made to the domain of `x`; return
+        False if no revision was made.
+        """
+        if self.crossword.overlaps[x, y] is None:
+            return False
+        x_intersect, y_intersect = self.crossword.overlaps[x, y]
+
+        supported = dict()
+        removed = []
+        for word in self.domains[x]:
+            letter = word[x_intersect]
+            if letter not in supported:
+                supported[letter] = self.find_support(
+                    x, y, y_intersect, letter
+                )
+            if not supported[letter]:
+                removed.append(word)
+
+        if not removed:
+            return False
+        self.prune(x, removed)
+        return True
+
+    def find_support(self, x, y, y_intersect, letter):
+        """
+        Return True if some word in the domain of `y` has `letter` at
+        position `y_intersect`, updating the last support of (x, letter, y).
+        """
+        # The candidates are fixed the first time they are needed, which
+        # is the AC-3 pass before search, so they cover every later domain
+        key = (y, y_intersect, letter)
+        if key not in self.orders:
+            self.orders[key] = tuple(
+                word for word in self.domains[y]
+                if word[y_intersect] == letter
+            )
+        candidates = self.orders[key]
+        domain = self.domains[y]
+
+        last = self.supports.get((x, letter, y))
+        if last is not None and candidates[last] in domain:
+            return True
+
+        # Resume after the last support, then wrap around, since words
+        # before it may have been restored by backtracking
+        start = 0 if last is None else last + 1
+        for k in range(start, len(candidates)):
+            if candidates[k] in domain:
+                self.supports[x, letter, y] = k
+                return True
+        for k in range(0, start - 1):
+            if candidates[k] in domain:
+                self.supports[x, letter, y] = k
+                return True
+        return False
+
+    def revise_arc(self, x, y):
+        """
+        Revise arc (x, y) with the method selected by `self.consistency`.
+        """
+        if self.stats is not None:
+            self.stats.revise_calls += 1
+        if self.consistency == "ac2001":
+            return self.revise_ac2001(x, y)
+        return self.revise(x, y)
 
     def ac3(self, arcs=None):
         """
@@ -174,12 +582,19 @@ class CrosswordCreator():
 
         # Create initial queue
         if arcs == None:
-            queue = []
+            arcs = []
             for keys, overlaps in self.crossword.overlaps.items():
                 if overlaps is not None:
-                    queue.append([keys[0], keys[1]])
-        else:
-            queue = arcs
+                    arcs.append(keys)
+
+        # Worklist of arcs, with the set of arcs in it so none is queued twice
+        queue = deque()
+        queued = set()
+        for arc in arcs:
+            arc = tuple(arc)
+            if arc not in queued:
+                queued.add(arc)
+                queue.append(arc)
 
         # for i, j in self.domains.items():
         #     print("before", i, j)
@@ -187,23 +602,210 @@ class CrosswordCreator():
         # # Enforce arc consistency
         # # Any time a domain is changed, this may change the requirements for another domain
         # #   Therefore, loop until no changes are made                
-        while len(queue) > 0:
-            var1, var2 = queue.pop()
+        while True:
+            while len(queue) > 0:
+                arc = queue.popleft()
+                queued.remove(arc)
+                var1, var2 = arc
+                if self.stats is not None:
+                    self.stats.arcs += 1
+
+                if self.revise_arc(var1, var2) == True:
+                    # No solution
+                    if not self.domains[var1]:
+                        self.bump(var1, var2)
+                        self.wipeout(var1)
+                        return False
+
+                    # Each domain change may cause other domains to be affected
+                    for variable in self.crossword.neighbors(var1):
+                        if variable != var2 and (variable, var1) not in queued:
+                            queued.add((variable, var1))
+                            queue.append((variable, var1))
+
+            # Once arcs are consistent, prune words that cannot be kept
+            # distinct, then revise the arcs into every domain that changed
+            if not self.alldiff:
+                break
+            changed = self.enforce_alldiff()
+            if changed is None:
+                return False
+            if not changed:
+                break
+            for var in changed:
+                for variable in self.crossword.neighbors(var):
+                    if (variable, var) not in queued:
+                        queued.add((variable, var))
+                        queue.append((variable, var))
 
-            if self.revise(var1, var2) == True:
-                # No solution
-                if not self.domains[var1]:
-                    return False
-                
-                # Each domain change may cause other domains to be affected
-                for variable in (self.crossword.neighbors(var1) - {var2}):
-                    queue.append((variable, var1))                
-                
         # for i, j in self.domains.items():
         #     print("after", i, j)
 
         return True
 
+    def enforce_alldiff(self):
+        """
+        Make each group of same-length variables consistent with the
+        constraint that they all take different words (Regin's matching
+        based filtering). A word is pruned from a domain if some set of k
+        other variables in the group has only k words between them,
+        including that one: a Hall set, whose words are all spoken for.
+        Only variables whose domain is no larger than their group can be in
+        a Hall set, so only those are matched.
+        Return the list of variables whose domain changed, or None if some
+        group cannot take distinct words, after wiping out one of them.
+        """
+        changed = []
+        for group in self.groups:
+            small = {
+                var: list(self.domains[var]) for var in group
+                if len(self.domains[var]) <= len(group)
+            }
+            if not small:
+                continue
+
+            # Maximum matching of small variables to words
+            mate = dict()
+            for var in small:
+                if not self.augment(var, small, mate, set()):
+                    self.prune(var, set(self.domains[var]))
+                    self.wipeout(var)
+                    return None
+            matched = {var: word for word, var in mate.items()}
+
+            # Words that can be freed, by an alternating path to a free word
+            free = [
+                word for words in small.values() for word in words
+                if word not in mate
+            ]
+            freed = set(free)
+            while free:
+                word = free.pop()
+                for var, words in small.items():
+                    if matched[var] != word and word in words:
+                        other = matched[var]
+                        if other not in freed:
+                            freed.add(other)
+                            free.append(other)
+
+            # The rest belong to Hall sets; a small variable may keep one
+            # only if it is on an alternating cycle through it
+            hall = [word for word in mate if word not in freed]
+            if not hall:
+                continue
+            reach = {
+                word: self.alternating_reach(word, small, mate)
+                for word in hall
+            }
+            for var in group:
+                domain = self.domains[var]
+                if var in small:
+                    removed = [
+                        word for word in hall
+                        if word in domain and mate[word] != var
+                        and var not in reach[word]
+                    ]
+                else:
+                    removed = [word for word in hall if word in domain]
+                if removed:
+                    self.prune(var, removed)
+                    changed.append(var)
+                    if not self.domains[var]:
+                        self.wipeout(var)
+                        return None
+        return changed
+
+    def augment(self, var, small, mate, seen):
+        """
+        Find an augmenting path from `var` in the matching `mate` of words
+        to variables, updating it. Return True if one was found.
+        """
+        for word in small[var]:
+            if word in seen:
+                continue
+            seen.add(word)
+            if word not in mate or self.augment(mate[word], small, mate, seen):
+                mate[word] = var
+                return True
+        return False
+
+    def alternating_reach(self, word, small, mate):
+        """
+        Return the set of variables reachable from `word` by alternating
+        paths: from a word to the variable matched to it, and from a
+        variable to any other word in its domain.
+        """
+        reached = set()
+        frontier = [word]
+        seen = {word}
+        while frontier:
+            var = mate.get(frontier.pop())
+            if var is None or var in reached:
+                continue
+            reached.add(var)
+            for other in small[var]:
+                if other not in seen:
+                    seen.add(other)
+                    frontier.append(other)
+        return reached
+
+
+    def prune(self, var, removed):
+        """
+        Remove the words in `removed` from the domain of `var`, and record
+        them on the trail so that `undo` can restore them.
+        """
+        self.domains[var].difference_update(removed)
+        self.trail.append((var, removed))
+        if self.backjumping:
+            self.causes[var].append(self.cause)
+        self.touch(var)
+
+    def wipeout(self, var):
+        """Record that propagation wiped out the domain of `var`."""
+        self.wiped = var
+        if self.stats is not None:
+            self.stats.wipeouts += 1
+
+    def undo(self, mark):
+        """
+        Restore every removal recorded on the trail after position `mark`.
+        """
+        while len(self.trail) > mark:
+            var, removed = self.trail.pop()
+            self.domains[var].update(removed)
+            if self.backjumping:
+                self.causes[var].pop()
+            self.touch(var)
+
+    def infer(self, var, assignment):
+        """
+        Propagate the assignment of `var` into the domains of the variables
+        still unassigned, according to `self.inference`.
+        Return False if some domain is wiped out, True otherwise.
+        """
+        if self.inference is None:
+            return True
+        self.cause = var
+
+        # The domain of an assigned variable is just its value
+        domain = self.domains[var]
+        removed = domain - {assignment[var]}
+        if removed:
+            self.prune(var, removed)
+
+        neighbors = [
+            neighbor for neighbor in self.crossword.neighbors(var)
+            if neighbor not in assignment
+        ]
+        if self.inference == "forward":
+            for neighbor in neighbors:
+                if self.revise_arc(neighbor, var) and not self.domains[neighbor]:
+                    self.bump(neighbor, var)
+                    self.wipeout(neighbor)
+                    return False
+            return not self.alldiff or self.enforce_alldiff() is not None
+        return self.ac3([(neighbor, var) for neighbor in neighbors])
 
     def assignment_complete(self, assignment):
         """
@@ -243,6 +845,33 @@ class CrosswordCreator():
 
         return True
 
+    def consistent_with(self, var, assignment):
+        """
+        Return True if the value of `var` is consistent with the rest of
+        `assignment`, which is assumed to be consistent already: only the
+        length of the new word, its uniqueness against `self.used_words`
+        and the neighbors of `var` that are assigned are checked.
+        """
+        word = assignment[var]
+
+        # Check word length
+        if var.length != len(word):
+            return False
+
+        # Check distinct
+        if word in self.used_words:
+            return False
+
+        # Check conflict
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor in assignment:
+                var_overlap, neighbor_overlap = self.crossword.overlaps[var, neighbor]
+                if word[var_overlap] != assignment[neighbor][neighbor_overlap]:
+                    self.bump(var, neighbor)
+                    return False
+
+        return True
+
 
     def order_domain_values(self, var, assignment):
         """
@@ -250,57 +879,181 @@ class CrosswordCreator():
         the number of values they rule out for neighboring variables.
         The first value in the list, for example, should be the one
         that rules out the fewest values among the neighbors of `var`.
+
+        For each unassigned neighbor, a histogram of the letters its words
+        have at the overlap is built once. A word rules out every neighbor
+        word without its letter there, so its eliminations are summed over
+        neighbors from the histograms; with NumPy, in one vectorized pass
+        over the encoded words of the domain.
         """
+        histograms = []
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor in assignment:
+                continue
+            var_intersect, neighbor_intersect = self.crossword.overlaps[var, neighbor]
+            size, histogram = self.letter_histogram(neighbor, neighbor_intersect)
+            histograms.append((var_intersect, size, histogram))
 
-        elim_dict = {}
-        for word in self.domains[var]:
-            # print("word", word)
-            # Count number of eliminations for each word
-            for neighbor in self.crossword.neighbors(var):
-                var_intersect, neighbor_intersect = self.crossword.overlaps[var, neighbor]
-                # print("intersect", var_intersect, neighbor_intersect)
+        if np is None:
+            def eliminations(word):
+                return sum(
+                    size - histogram.get(word[position], 0)
+                    for position, size, histogram in histograms
+                )
+            words = list(self.domains[var])
+            if self.random is not None:
+                self.random.shuffle(words)
+            return sorted(words, key=eliminations)
 
-                elim_count = 0
-                for neigh_word in self.domains[neighbor]:
-                    # print("word, neigh_words", word, neigh_word)
-                    if word[var_intersect] != neigh_word[neighbor_intersect]:
-                        elim_count += 1
-                elim_dict.update({word: elim_count})
+        table = self.crossword.table
+        ids = self.domain_ids(var)
+        if self.random is not None:
+            ids = ids[self.random.sample(range(len(ids)), len(ids))]
+        codes = table.encoded(var.length)[ids]
+        scores = np.zeros(len(ids), dtype=np.int64)
+        for position, size, histogram in histograms:
+            counts = np.zeros(len(table.alphabet), dtype=np.int64)
+            for letter, count in histogram.items():
+                counts[table.codes[letter]] = count
+            scores += size - counts[codes[:, position]]
 
-        sorted_keys = sorted(elim_dict, key=lambda x: elim_dict[x])
+        bucket = table.buckets.get(var.length, [])
+        return [bucket[i] for i in ids[np.argsort(scores, kind="stable")]]
 
-        return sorted_keys
-    
+    def letter_histogram(self, var, position):
+        """
+        Return (n, histogram), where n is the number of words in the
+        domain of `var` and histogram maps each letter to the number of
+        those words with that letter at `position`.
+        """
+        if np is None:
+            domain = self.domains[var]
+            return len(domain), Counter(word[position] for word in domain)
+
+        table = self.crossword.table
+        ids = self.domain_ids(var)
+        counts = np.bincount(
+            table.encoded(var.length)[ids, position],
+            minlength=len(table.alphabet)
+        )
+        histogram = {
+            table.alphabet[code]: int(counts[code])
+            for code in np.flatnonzero(counts)
+        }
+        return len(ids), histogram
+
+    def domain_ids(self, var):
+        """
+        Return a NumPy array of the word table ids of the words in the
+        domain of `var`. Words that cannot fit `var` are left out.
+        """
+        ids = self.crossword.table.ids
+        return np.fromiter(
+            (ids[word] for word in self.domains[var] if len(word) == var.length),
+            dtype=np.intp
+        )
 
     def select_unassigned_variable(self, assignment):
         """
         Return an unassigned variable not already part of `assignment`.
-        Choose the variable with the minimum number of remaining values
-        in its domain. If there is a tie, choose the variable with the highest
-        degree. If there is a tie, any of the tied variables are acceptable
-        return values.
+        With "mrv" ordering, choose the variable with the minimum number of
+        remaining values in its domain. If there is a tie, choose the
+        variable with the highest degree. With "domwdeg" ordering, choose
+        the variable with the smallest domain size per unit of weighted
+        degree. If there is a tie, any of the tied variables are
+        acceptable return values.
+
+        During search the choice is served from the priority queue, which
+        is kept up to date as domains, assignments and weights change.
         """
-  
-        choice = None
-        for var in self.domains:
-            if var in assignment:
-                continue
-            
-            # Init choice
-            if choice is None:
-                choice = var
+        if self.queue is None:
+            unassigned = [var for var in self.domains if var not in assignment]
+            if not unassigned:
+                return None
+            return min(unassigned, key=lambda var: self.priority(var, assignment))
+
+        # Drop entries that are stale or belong to assigned variables
+        while self.queue:
+            _, _, version, var = self.queue[0]
+            if version == self.versions[var] and var not in assignment:
+                return var
+            heapq.heappop(self.queue)
+        return None
+
+    def priority(self, var, assignment):
+        """
+        Return the sort key of `var` under `self.ordering`; the variable
+        with the smallest key is selected first.
+        """
+        size = len(self.domains[var])
+        if self.ordering == "domwdeg":
+            wdeg = sum(
+                self.weights.get((var, neighbor), 1)
+                for neighbor in self.crossword.neighbors(var)
+                if neighbor not in assignment
+            )
+            key = (size / max(wdeg, 1),)
+        else:
+            key = (size, -len(self.crossword.neighbors(var)))
+        if self.random is not None:
+            key += (self.random.random(),)
+        return key
+
+    def touch(self, var):
+        """
+        Requeue `var` after something its priority depends on changed.
+        Does nothing outside of search.
+        """
+        if self.queue is None:
+            return
+        self.versions[var] += 1
+        if var in self.assignment:
+            return
+        heapq.heappush(self.queue, [
+            self.priority(var, self.assignment), next(self.counter),
+            self.versions[var], var
+        ])
 
-            # Choose var with the smallest domain
-            elif len(self.domains[var]) < len(self.domains[choice]):
-                choice = var
+        # Stale entries pile up; rebuild once they dominate the heap
+        if len(self.queue) > 4 * len(self.domains) + 64:
+            self.build_queue(self.assignment)
 
-            # If tie, choose the variable with the highest degree (most neighbors)
-            elif len(self.domains[var]) == len(self.domains[choice]):
-                if len(self.crossword.neighbors(var)) > len(self.crossword.neighbors(choice)):
-                    choice = var
+    def touch_neighbors(self, var):
+        """
+        Requeue the neighbors of `var`, whose weighted degree depends on
+        whether `var` is assigned.
+        """
+        if self.ordering == "domwdeg":
+            for neighbor in self.crossword.neighbors(var):
+                self.touch(neighbor)
 
-        return choice
+    def build_queue(self, assignment):
+        """
+        Build the priority queue of the variables unassigned in `assignment`.
+        """
+        self.assignment = assignment
+        self.queue = []
+        for var in self.domains:
+            self.versions[var] = self.versions.get(var, 0) + 1
+            if var not in assignment:
+                self.queue.append([
+                    self.priority(var, assignment), next(self.counter),
+                    self.versions[var], var
+                ])
+        heapq.heapify(self.queue)
 
+    def bump(self, x, y):
+        """
+        Increase the weight of the constraint between `x` and `y`, after
+        it caused a domain wipeout or a conflict.
+        """
+        if self.ordering != "domwdeg":
+            return
+        weight = self.weights.get((x, y), 1) + 1
+        self.weights[x, y] = weight
+        self.weights[y, x] = weight
+        self.touch(x)
+        self.touch(y)
 
     def backtrack(self, assignment):
         """
@@ -308,10 +1061,87 @@ class CrosswordCreator():
         crossword and return a complete assignment if possible to do so.
         `assignment` is a mapping from variables (keys) to words (values).
         If no assignment is possible, return None.
+        Domains are left as they were before search either way, so that
+        the same creator can search again.
+        """
+        self.used_words = set(assignment.values())
+        self.build_queue(assignment)
+        self.nodes = 0
+        mark = len(self.trail)
+        fixed = set(assignment)
+        if self.verify:
+            before = {var: domain.copy() for var, domain in self.domains.items()}
+        try:
+            with self.phase("search"):
+                if self.backjumping:
+                    self.path = list(assignment)
+                    self.depth = {var: k for k, var in enumerate(self.path)}
+                    result, _ = self.backjump(assignment)
+                else:
+                    result = self.search(assignment)
+
+            # Copy the solution out before undoing the pruning of its branch,
+            # which search stops in the middle of
+            if result is not None:
+                result = dict(result)
+            self.undo(mark)
+            if self.verify and self.domains != before:
+                raise AssertionError("Search left domains pruned")
+            return result
+        except SearchInterrupted:
+            # Leave domains and assignment as they were, ready for a restart
+            self.undo(mark)
+            for var in set(assignment) - fixed:
+                del assignment[var]
+            raise
+        finally:
+            self.queue = None
+            self.cause = None
+
+    def count_node(self, assignment):
+        """
+        Count a search node extending `assignment`, and raise
+        SearchInterrupted if the node limit is reached or, checking every
+        1000 nodes, if `interrupt()` is True.
+        """
+        self.nodes += 1
+        if self.stats is not None:
+            self.record_node(assignment)
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchInterrupted()
+        if (self.interrupt is not None and self.nodes % 1000 == 0
+                and self.interrupt()):
+            raise SearchInterrupted()
+
+    def record_node(self, assignment):
+        """Count a search node in the stats, and report progress."""
+        stats = self.stats
+        stats.nodes += 1
+        if len(assignment) > stats.max_depth:
+            stats.max_depth = len(assignment)
+        if (self.progress is not None
+                and stats.nodes % self.progress_every == 0):
+            self.progress(stats)
+
+    def search(self, assignment):
         """
+        Recursive step of `backtrack`, with `self.used_words` holding the
+        words of `assignment`: return the first solution found, or None.
+        """
+        return next(self.solutions(assignment), None)
+
+    def solutions(self, assignment):
+        """
+        Yield every complete, consistent extension of `assignment`.
+        The same dict is yielded each time, filled with the solution; search
+        carries on from it when the generator is resumed.
+        """
+        self.count_node(assignment)
+
         # Terminal condition
         if self.assignment_complete(assignment) == True:
-            return assignment
+            yield assignment
+            return
         # for i, j in self.domains.items():
         #     print(i, "///", j)
 
@@ -322,27 +1152,461 @@ class CrosswordCreator():
             assignment[var] = value
 
             # If consistent, continue recursively with current comp
-            if self.consistent(assignment) == True:
-                result = self.backtrack(assignment)
-                if result != None:
-                    return result
-                
-            # Else, remove newest addition and
+            consistent = self.consistent_with(var, assignment)
+            if self.verify and consistent != self.consistent(assignment):
+                raise AssertionError(
+                    f"Incremental check disagrees with full scan at {var}"
+                )
+            if consistent:
+                self.used_words.add(value)
+                self.touch_neighbors(var)
+                mark = len(self.trail)
+                if self.infer(var, assignment):
+                    yield from self.solutions(assignment)
+                self.undo(mark)
+                self.used_words.remove(value)
+
+            # Remove newest addition and
             # continue the 'for loop' to try new comp
-            else:
+            assignment.pop(var)
+            if self.stats is not None:
+                self.stats.backtracks += 1
+
+        # Back in the queue now that `var` is unassigned again
+        self.touch(var)
+        self.touch_neighbors(var)
+
+    def iter_solutions(self):
+        """
+        Enforce node and arc consistency, and then lazily yield every
+        distinct solution of the CSP, each as a new dict.
+        Solutions are found by chronological backtracking, even if
+        `self.backjumping` is set.
+        """
+        for assignment in self.enumerate_solutions():
+            yield dict(assignment)
+
+    def count_solutions(self, limit=None):
+        """
+        Enforce node and arc consistency, and then count the solutions of
+        the CSP, stopping at `limit` if it is given. No solution is copied.
+        """
+        count = 0
+        if limit is not None and limit <= 0:
+            return count
+        for _ in self.enumerate_solutions():
+            count += 1
+            if count == limit:
+                break
+        return count
+
+    def enumerate_solutions(self):
+        """
+        Yield every solution as the same, reused assignment dict. Domains
+        are restored once the generator is exhausted or closed.
+        """
+        if not self.preprocess():
+            return
+        assignment = dict()
+        self.used_words = set()
+        self.build_queue(assignment)
+        self.nodes = 0
+        try:
+            yield from self.solutions(assignment)
+        finally:
+            self.undo(0)
+            self.queue = None
+            self.cause = None
+
+    def backjump(self, assignment):
+        """
+        Recursive step of `backtrack` with conflict-directed backjumping.
+        Return (result, conflicts): result is a complete assignment, or None
+        if `assignment` cannot be extended, in which case conflicts is the
+        set of assigned variables responsible. Search returns straight past
+        any variable that is not among them.
+        """
+        self.count_node(assignment)
+
+        # Terminal condition
+        if self.assignment_complete(assignment) == True:
+            return assignment, set()
+
+        var = self.select_unassigned_variable(assignment)
+
+        # Values missing from the domain were pruned by earlier assignments
+        conflicts = self.explain(var)
+
+        for value in self.order_domain_values(var, assignment):
+            assignment[var] = value
+
+            culprits = self.conflicts_with(var, assignment)
+            if self.verify and (culprits is None) != self.consistent(assignment):
+                raise AssertionError(
+                    f"Incremental check disagrees with full scan at {var}"
+                )
+            if culprits is None:
+                culprits = self.match_nogood(var, assignment)
+            if culprits is not None:
+                conflicts |= culprits
                 assignment.pop(var)
+                if self.stats is not None:
+                    self.stats.backtracks += 1
+                continue
+
+            self.used_words.add(value)
+            self.touch_neighbors(var)
+            self.depth[var] = len(self.path)
+            self.path.append(var)
+            mark = len(self.trail)
+
+            jump = None
+            if self.infer(var, assignment):
+                result, child = self.backjump(assignment)
+                if result is not None:
+                    return result, set()
+                if var in child:
+                    conflicts |= child - {var}
+                else:
+                    jump = child
+            else:
+                conflicts |= self.explain(self.wiped) - {var}
+
+            self.undo(mark)
+            self.path.pop()
+            del self.depth[var]
+            self.used_words.remove(value)
+            assignment.pop(var)
+            if self.stats is not None:
+                self.stats.backtracks += 1
+
+            # `var` played no part in the failure below, so skip its values
+            if jump is not None:
+                self.touch(var)
+                self.touch_neighbors(var)
+                return None, jump
+
+        self.add_nogood(conflicts, assignment)
+        self.touch(var)
+        self.touch_neighbors(var)
+        return None, conflicts
+
+    def conflicts_with(self, var, assignment):
+        """
+        Like `consistent_with`, but return None if the value of `var` is
+        consistent, and otherwise the set of assigned variables it
+        conflicts with.
+        """
+        word = assignment[var]
+        if var.length != len(word):
+            return set()
+
+        culprits = set()
+        if word in self.used_words:
+            culprits.update(
+                other for other, value in assignment.items()
+                if value == word and other != var
+            )
+        for neighbor in self.crossword.neighbors(var):
+            if neighbor in assignment:
+                var_overlap, neighbor_overlap = self.crossword.overlaps[var, neighbor]
+                if word[var_overlap] != assignment[neighbor][neighbor_overlap]:
+                    self.bump(var, neighbor)
+                    culprits.add(neighbor)
+
+        return culprits or None
+
+    def explain(self, var):
+        """
+        Return the set of assigned variables whose propagation pruned the
+        current domain of `var`. Forward checking only prunes against the
+        variable just assigned; with MAC, or with all-different pruning, a
+        pruning may depend on anything assigned up to that point, so the
+        whole prefix of the path is used.
+        """
+        causes = [cause for cause in self.causes[var] if cause is not None]
+        if not causes:
+            return set()
+        if self.inference == "mac" or self.alldiff:
+            deepest = max(self.depth[cause] for cause in causes)
+            return set(self.path[:deepest + 1])
+        return set(causes)
+
+    def match_nogood(self, var, assignment):
+        """
+        If the assignment of `var` completes a cached nogood, return the
+        other variables in it; otherwise return None.
+        """
+        for nogood in self.nogood_index.get((var, assignment[var]), ()):
+            if all(assignment.get(other) == word for other, word in nogood):
+                self.nogoods.move_to_end(nogood)
+                return {other for other, _ in nogood if other != var}
+        return None
+
+    def add_nogood(self, conflicts, assignment):
+        """
+        Cache the assignment of `conflicts` as a nogood, evicting the least
+        recently used nogood if the cache is full.
+        """
+        if self.nogood_limit <= 0:
+            return
+        nogood = frozenset((var, assignment[var]) for var in conflicts)
+        if nogood in self.nogoods:
+            self.nogoods.move_to_end(nogood)
+            return
+        self.nogoods[nogood] = True
+        for pair in nogood:
+            self.nogood_index.setdefault(pair, set()).add(nogood)
+
+        if len(self.nogoods) > self.nogood_limit:
+            evicted, _ = self.nogoods.popitem(last=False)
+            for pair in evicted:
+                self.nogood_index[pair].discard(evicted)
+                if not self.nogood_index[pair]:
+                    del self.nogood_index[pair]
             
 
-def main():
+class BitsetCrosswordCreator(CrosswordCreator):
+
+    def __init__(self, crossword, *args, **kwargs):
+        """
+        Create a bitset-based crossword generator. Domains are bitmasks
+        over the word table, revised through its letter index, which is
+        built here for the slot lengths of the grid if not built yet.
+        """
+        crossword.table.index_lengths(
+            {var.length for var in crossword.variables}
+        )
+        super().__init__(crossword, *args, **kwargs)
+
+    def initial_domain(self, var):
+        """
+        Return the domain `var` starts with: a bitset over the word table
+        bucket of its length, rather than a copy of the vocabulary.
+        """
+        return self.crossword.table.domain(var.length)
+
+    def enforce_node_consistency(self):
+        """
+        Update `self.domains` such that each variable is node-consistent.
+        Domains are drawn from the word table bucket of the variable's
+        length, so only the bucket's mask needs to be applied.
+        """
+        for var, domain in self.domains.items():
+            domain.intersection_update(
+                self.crossword.table.full_mask(var.length)
+            )
+
+    def revise(self, x, y):
+        """
+        Make variable `x` arc consistent with variable `y`.
+        A letter at the overlap is supported if the domain of `y` meets the
+        index entry for that letter; the domain of `x` is then intersected
+        with the union of the index entries of the supported letters.
+
+        Return True if a revision was made to the domain of `x`; return
+        False if no revision was made.
+        """
+        if self.crossword.overlaps[x, y] is None:
+            return False
+        x_intersect, y_intersect = self.crossword.overlaps[x, y]
+        index = self.crossword.table.index
+
+        y_mask = self.domains[y].mask
+        supported = 0
+        for letter in self.crossword.table.letters[y.length, y_intersect]:
+            if y_mask & index[y.length, y_intersect, letter]:
+                supported |= index.get((x.length, x_intersect, letter), 0)
+
+        removed = self.domains[x].mask & ~supported
+        if not removed:
+            return False
+        self.prune(x, removed)
+        return True
+
+    def revise_ac2001(self, x, y):
+        """
+        Make variable `x` arc consistent with variable `y`, AC-2001 style.
+        Checking the support of a letter is a single mask test against the
+        domain of `y`, so there is no scan for a remembered support to
+        save: this is the same as `revise`.
+        """
+        return self.revise(x, y)
+
+    def letter_histogram(self, var, position):
+        """
+        Return (n, histogram), where n is the number of words in the
+        domain of `var` and histogram maps each letter to the number of
+        those words with that letter at `position`.
+        Each count is a popcount of the domain masked by the index.
+        """
+        index = self.crossword.table.index
+        mask = self.domains[var].mask
+        histogram = dict()
+        for letter in self.crossword.table.letters[var.length, position]:
+            count = (mask & index[var.length, position, letter]).bit_count()
+            if count:
+                histogram[letter] = count
+        return mask.bit_count(), histogram
+
+    def domain_ids(self, var):
+        """
+        Return a NumPy array of the word table ids of the words in the
+        domain of `var`, read directly off its bitmask.
+        """
+        bits = bin(self.domains[var].mask)[:1:-1].encode()
+        return np.flatnonzero(np.frombuffer(bits, dtype=np.uint8) == ord("1"))
 
-    # Check usage
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Usage: python generate.py structure words [output]")
+
+def solve_component(cls, crossword, options, taken=()):
+    """
+    Solve `crossword`, usually one component of a larger grid, with a
+    creator of class `cls` built with `options`, and without using any
+    word in `taken`. Return the assignment, or None if there is none.
+    """
+    creator = cls(crossword, **options)
+    if taken:
+        for var, domain in creator.domains.items():
+            removed = domain & taken
+            if removed:
+                domain.difference_update(removed)
+    if not creator.preprocess():
+        return None
+    return creator.backtrack(dict())
+
+
+def component_worker(cls, structure, words, options, k):
+    """
+    Solve the `k`th component of a crossword in a worker process.
+    """
+    crossword = Crossword(structure, words)
+    return solve_component(
+        cls, crossword.restrict(crossword.components[k]), options
+    )
+
+
+# Solver engines by the name the command line uses for them
+ENGINES = {
+    "set": CrosswordCreator,
+    "bitset": BitsetCrosswordCreator,
+}
+
+
+# Heuristic combinations cycled through by portfolio workers
+PORTFOLIO = [
+    dict(inference="mac", ordering="domwdeg"),
+    dict(inference="mac", ordering="mrv"),
+    dict(inference="forward", ordering="domwdeg"),
+    dict(inference="forward", ordering="mrv", backjumping=True),
+]
+
+
+def restart_worker(structure, words, options, seed, stop,
+                   cutoff=100, growth=1.5):
+    """
+    Solve a crossword in a worker process with randomized restarts.
+    Search is cut off after `cutoff` nodes, and restarted with a cutoff
+    `growth` times larger, keeping learned weights and nogoods, until it
+    finishes or `stop` is set.
+    Return ("solved", assignment), ("unsolvable", None) if the crossword
+    has no solution, or ("stopped", None) if another worker finished first.
+    """
+    crossword = Crossword(structure, words)
+    creator = BitsetCrosswordCreator(crossword, seed=seed, **options)
+    creator.interrupt = stop.is_set
+    if not creator.preprocess():
+        return "unsolvable", None
+
+    while not stop.is_set():
+        creator.node_limit = int(cutoff)
+        try:
+            assignment = creator.backtrack(dict())
+        except SearchInterrupted:
+            cutoff *= growth
+            continue
+        if assignment is None:
+            return "unsolvable", None
+        return "solved", assignment
+    return "stopped", None
+
+
+def portfolio(structure, words, workers=None, seed=0):
+    """
+    Solve a crossword with `workers` processes (by default, one per core),
+    each with its own seed and heuristic combination from PORTFOLIO.
+    The first worker to finish stops the others.
+    Return the assignment found, or None if there is no solution.
+    """
+    workers = workers or os.cpu_count() or 1
+    with multiprocessing.Manager() as manager:
+        stop = manager.Event()
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [
+                executor.submit(
+                    restart_worker, structure, words,
+                    PORTFOLIO[k % len(PORTFOLIO)], seed + k, stop
+                )
+                for k in range(workers)
+            ]
+            try:
+                for future in as_completed(futures):
+                    status, assignment = future.result()
+                    if status != "stopped":
+                        return assignment
+            finally:
+                stop.set()
+    return None
+
+
+def main():
 
     # Parse command-line arguments
-    structure = sys.argv[1]
-    words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
+    parser = argparse.ArgumentParser(description="Generate a crossword.")
+    parser.add_argument("structure")
+    parser.add_argument("words")
+    parser.add_argument("output", nargs="?")
+    parser.add_argument(
+        "--engine", choices=ENGINES,
+        help="domain representation (default: set)"
+    )
+    parser.add_argument(
+        "--inference",
+        choices=[str(i) for i in CrosswordCreator.INFERENCES],
+        help="inference after each assignment (default: None)"
+    )
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument(
+        "--portfolio", type=int, metavar="N",
+        help="solve with N parallel bitset workers using randomized "
+             "restarts, each with its own seed and heuristics"
+    )
+    modes.add_argument(
+        "--components", type=int, nargs="?", const=0, metavar="WORKERS",
+        help="solve groups of slots that do not intersect separately, "
+             "in WORKERS processes if given"
+    )
+    modes.add_argument(
+        "--stats", action="store_true",
+        help="print solver counters and phase times"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="seed of the first portfolio worker"
+    )
+    args = parser.parse_intermixed_args()
+    if args.portfolio is not None:
+        if args.portfolio < 1:
+            parser.error("--portfolio needs at least one worker")
+        if args.engine or args.inference:
+            parser.error(
+                "--portfolio uses the bitset engine and takes each "
+                "worker's inference from its heuristics"
+            )
+    engine = ENGINES[args.engine or "set"]
+    inference = None if args.inference in (None, "None") else args.inference
+    structure = args.structure
+    words = args.words
+    output = args.output
 
     # print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
     # print("(╯°□°)╯︵ ┻━┻")
@@ -352,8 +1616,20 @@ def main():
 
     # Generate crossword
     crossword = Crossword(structure, words)
-    creator = CrosswordCreator(crossword)
-    assignment = creator.solve()
+    if args.portfolio is not None:
+        # Only used to print and save the workers' assignment
+        creator = BitsetCrosswordCreator(crossword)
+        assignment = portfolio(structure, words, args.portfolio, args.seed)
+    elif args.components is not None:
+        creator = engine(crossword, inference=inference)
+        assignment = creator.solve_components(args.components)
+    elif args.stats:
+        creator = engine(crossword, inference=inference)
+        assignment, stats = creator.solve_with_stats()
+        print(stats)
+    else:
+        creator = engine(crossword, inference=inference)
+        assignment = creator.solve()
 
     # Print result
     if assignment is None:
@@ -0,0 +1,167 @@
+from xml.sax.saxutils import escape
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FONT = "assets/fonts/OpenSans-Regular.ttf"
+
+# Renderers by (font file, cell size), so fonts and glyphs are loaded once
+# per process however many grids are saved
+RENDERERS = dict()
+
+
+def get_renderer(font_file=FONT, cell_size=100):
+    """Return the cached Renderer for a font and cell size."""
+    key = (font_file, cell_size)
+    if key not in RENDERERS:
+        RENDERERS[key] = Renderer(font_file, cell_size)
+    return RENDERERS[key]
+
+
+class Renderer():
+
+    # Tile keys besides letters
+    BLOCK = None
+    EMPTY = ""
+
+    def __init__(self, font_file=FONT, cell_size=100, cell_border=2,
+                 font_size=80):
+        """
+        Render crossword grids as images, one cell-sized tile per square.
+        The font is loaded once, and each tile is drawn the first time it
+        is needed: a black square, an empty white square, or a white
+        square with a letter. Grids are then composited from the tiles.
+        """
+        from PIL import ImageFont
+        self.font = ImageFont.truetype(font_file, font_size)
+        self.cell_size = cell_size
+        self.cell_border = cell_border
+
+        # Glyph atlas: tile images, and with NumPy their pixels stacked in
+        # one array, indexed by the position of each key in `keys`
+        self.tiles = dict()
+        self.keys = dict()
+        self.atlas = None
+
+    def tile(self, key):
+        """Return the tile image for `key`, drawing it on first use."""
+        if key not in self.tiles:
+            from PIL import Image, ImageDraw
+            size = self.cell_size
+            border = self.cell_border
+            interior_size = size - 2 * border
+
+            img = Image.new("RGBA", (size, size), "black")
+            if key is not self.BLOCK:
+                draw = ImageDraw.Draw(img)
+                draw.rectangle(
+                    [(border, border), (size - border, size - border)],
+                    fill="white"
+                )
+                if key:
+                    bbox = draw.textbbox((0, 0), key, font=self.font)
+                    w, h = bbox[2] - bbox[0], bbox[3] - bbox[1]
+                    draw.text(
+                        (border + ((interior_size - w) / 2),
+                         border + ((interior_size - h) / 2) - 10),
+                        key, fill="black", font=self.font
+                    )
+            self.tiles[key] = img
+        return self.tiles[key]
+
+    def code(self, key):
+        """Return the index of `key` in the atlas, adding it if missing."""
+        if key not in self.keys:
+            pixels = np.asarray(self.tile(key))[np.newaxis]
+            if self.atlas is None:
+                self.atlas = pixels
+            else:
+                self.atlas = np.concatenate([self.atlas, pixels])
+            self.keys[key] = len(self.keys)
+        return self.keys[key]
+
+    def image(self, structure, letters):
+        """
+        Return an image of a grid, given its structure and letter grid as
+        built by CrosswordCreator.letter_grid.
+        """
+        from PIL import Image
+        height, width = len(structure), len(structure[0])
+        size = self.cell_size
+        keys = [
+            [
+                (letters[i][j] or self.EMPTY) if structure[i][j]
+                else self.BLOCK
+                for j in range(width)
+            ]
+            for i in range(height)
+        ]
+
+        if np is None:
+            img = Image.new("RGBA", (width * size, height * size), "black")
+            for i, row in enumerate(keys):
+                for j, key in enumerate(row):
+                    img.paste(self.tile(key), (j * size, i * size))
+            return img
+
+        # Gather the tile of every square, then lay them out row by row
+        codes = np.array([[self.code(key) for key in row] for row in keys])
+        pixels = self.atlas[codes].transpose(0, 2, 1, 3, 4).reshape(
+            height * size, width * size, 4
+        )
+        return Image.fromarray(pixels, "RGBA")
+
+    def save(self, structure, letters, filename):
+        """Save an image of a grid to `filename`."""
+        self.image(structure, letters).save(filename)
+
+
+def svg(structure, letters, cell_size=100, cell_border=2, font_size=80):
+    """
+    Return an SVG document of a grid, with the same layout as the images
+    drawn by Renderer, and letters left to the viewer to typeset.
+    """
+    height, width = len(structure), len(structure[0])
+    interior_size = cell_size - 2 * cell_border
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" '
+        f'width="{width * cell_size}" height="{height * cell_size}" '
+        f'viewBox="0 0 {width * cell_size} {height * cell_size}">',
+        f'<rect width="100%" height="100%" fill="black"/>',
+        f'<g font-family="Open Sans, sans-serif" font-size="{font_size}" '
+        f'text-anchor="middle" dominant-baseline="central">'
+    ]
+    for i in range(height):
+        for j in range(width):
+            if not structure[i][j]:
+                continue
+            x = j * cell_size + cell_border
+            y = i * cell_size + cell_border
+            lines.append(
+                f'<rect x="{x}" y="{y}" width="{interior_size}" '
+                f'height="{interior_size}" fill="white"/>'
+            )
+            if letters[i][j]:
+                lines.append(
+                    f'<text x="{x + interior_size / 2}" '
+                    f'y="{y + interior_size / 2}">'
+                    f'{escape(letters[i][j])}</text>'
+                )
+    lines.append("</g>")
+    lines.append("</svg>")
+    return "\n".join(lines) + "\n"
+
+
+def text(structure, letters):
+    """
+    Return a grid as text, the way CrosswordCreator.print shows it.
+    """
+    return "".join(
+        "".join(
+            (letters[i][j] or " ") if structure[i][j] else "█"
+            for j in range(len(structure[i]))
+        ) + "\n"
+        for i in range(len(structure))
+    )
@@ -1,12 +1,26 @@
-import itertools
+import math
 import random
 
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Most partial assignments kept per cell when counting the mine
+# configurations of a frontier component, before falling back to estimates
+STATE_LIMIT = 50000
+
 
 class Minesweeper():
     """
     Minesweeper game representation
     """
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, seed=None):
+
+        # Mines are placed by a generator seeded with `seed`, if given
+        rng = random if seed is None else random.Random(seed)
 
         # Set initial width, height, and number of mines
         self.height = height
@@ -23,8 +37,8 @@ class Minesweeper():
 
         # Add mines randomly
         while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
+            i = rng.randrange(height)
+            j = rng.randrange(width)
             if not self.board[i][j]:
                 self.mines.add((i, j))
                 self.board[i][j] = True
@@ -138,23 +152,428 @@ class Sentence():
         if cell in self.cells:
             self.cells.remove(cell)
 
+class BitSentence():
+    """
+    Logical statement about a Minesweeper game, like Sentence, stored
+    compactly: cell (i, j) of a board `width` cells wide is bit
+    i * width + j - base of `mask`, where `base` is the lowest cell in the
+    sentence, so the mask spans the sentence rather than the board.
+    Bit sentences are immutable and hashable; marking a cell returns a new
+    sentence.
+    """
+
+    __slots__ = ("width", "base", "mask", "count", "hash")
+
+    def __init__(self, cells, count, width):
+        indices = [i * width + j for i, j in cells]
+        base = min(indices, default=0)
+        mask = 0
+        for index in indices:
+            mask |= 1 << (index - base)
+        self.width = width
+        self.base = base
+        self.mask = mask
+        self.count = count
+        self.hash = hash((base, mask, count))
+
+    @classmethod
+    def from_mask(cls, width, base, mask, count):
+        """
+        Returns the bit sentence with the given mask of cells from `base`,
+        shifted so that its lowest cell is the base.
+        """
+        sentence = cls.__new__(cls)
+        if mask:
+            shift = (mask & -mask).bit_length() - 1
+            base += shift
+            mask >>= shift
+        else:
+            base = 0
+        sentence.width = width
+        sentence.base = base
+        sentence.mask = mask
+        sentence.count = count
+        sentence.hash = hash((base, mask, count))
+        return sentence
+
+    @property
+    def cells(self):
+        """The set of cells in the sentence."""
+        # Sentences hold few cells, so walk the set bits one at a time
+        cells = set()
+        mask = self.mask
+        while mask:
+            low = mask & -mask
+            cells.add(divmod(self.base + low.bit_length() - 1, self.width))
+            mask ^= low
+        return cells
+
+    def __len__(self):
+        return self.mask.bit_count()
+
+    def __contains__(self, cell):
+        k = cell[0] * self.width + cell[1] - self.base
+        return k >= 0 and (self.mask >> k) & 1 == 1
+
+    def __eq__(self, other):
+        if not isinstance(other, BitSentence):
+            return NotImplemented
+        return (
+            self.base == other.base and self.mask == other.mask
+            and self.count == other.count
+        )
+
+    def __hash__(self):
+        return self.hash
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    def aligned(self, other):
+        """Returns the mask of `other` shifted to start at `self.base`."""
+        shift = other.base - self.base
+        if shift >= 0:
+            return other.mask << shift
+        return other.mask >> -shift
+
+    def issubset(self, other):
+        """Returns True if every cell of this sentence is in `other`."""
+        if not self.mask:
+            return True
+        if self.base < other.base:
+            return False
+        return self.mask & ~self.aligned(other) == 0
+
+    def __sub__(self, other):
+        return BitSentence.from_mask(
+            self.width, self.base, self.mask & ~self.aligned(other),
+            self.count - other.count
+        )
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if len(self) == self.count:
+            return self.cells
+
+    def known_safes(self):
+        """
+        Returns the set of all cells in self.cells known to be safe.
+        """
+        if self.count == 0:
+            return self.cells
+
+    def without(self, cell, mine):
+        """
+        Returns the sentence with `cell` removed, given that it is a mine
+        if `mine` is True, and safe otherwise.
+        """
+        if cell not in self:
+            return self
+        k = cell[0] * self.width + cell[1] - self.base
+        return BitSentence.from_mask(
+            self.width, self.base, self.mask & ~(1 << k),
+            self.count - 1 if mine else self.count
+        )
+
+
+class FrontierComponent():
+    """
+    Cells of the frontier that share sentences, with the placements of
+    mines in them that satisfy every sentence counted by number of mines.
+
+    Cells are decided in order, and placements that leave the same number
+    of mines to place in every sentence still open are merged into one
+    state. There are few such states at any point of a long frontier when
+    the cells of each sentence are close together in `cells`.
+    """
+
+    def __init__(self, cells, sentences, state_limit=STATE_LIMIT):
+        self.cells = cells
+        n = len(cells)
+        position = {cell: p for p, cell in enumerate(cells)}
+        counts = []
+        last = []
+        # Sentences on each cell, with how many of their cells come after it
+        involved = [[] for _ in range(n)]
+        for j, sentence in enumerate(sentences):
+            ps = sorted(position[cell] for cell in sentence.cells)
+            counts.append(sentence.count)
+            last.append(ps[-1])
+            for k, p in enumerate(ps):
+                involved[p].append((j, len(ps) - 1 - k))
+
+        # Forward pass: the states after each cell, as the mines still to
+        # place in each open sentence, with the number of placements of the
+        # cells so far that reach them, by number of mines. Each layer is
+        # scaled to its largest count, as counts overflow floats otherwise
+        self.layers = [{(): [1.0]}]
+        self.moves = []
+        self.totals = None
+        before = []
+        current = set()
+        for p in range(n):
+            current.update(j for j, rest in involved[p])
+            current = {j for j in current if last[j] > p}
+            opened = sorted(current)
+            layer = dict()
+            steps = dict()
+            for state, poly in self.layers[-1].items():
+                residual = dict(zip(before, state))
+                steps[state] = []
+                for mine in (0, 1):
+                    changed = dict()
+                    for j, rest in involved[p]:
+                        r = residual.get(j, counts[j]) - mine
+                        if r < 0 or r > rest:
+                            break
+                        changed[j] = r
+                    else:
+                        after = tuple(
+                            changed[j] if j in changed else residual[j]
+                            for j in opened
+                        )
+                        steps[state].append((mine, after))
+                        add_poly(layer.setdefault(after, []), poly, mine)
+            if len(layer) > state_limit:
+                return
+            top = max((max(poly) for poly in layer.values()), default=0)
+            if not top:
+                return
+            self.layers.append({
+                state: [value / top for value in poly]
+                for state, poly in layer.items()
+            })
+            self.moves.append(steps)
+            before = opened
+        self.totals = self.layers[-1][()]
+
+    def probabilities(self, gains):
+        """
+        Returns the probability that each cell is a mine, given the weight
+        gains[k] of the placements of the rest of the board that go with a
+        placement of k mines in this component.
+        """
+        # Backward pass: the weight of each state, by number of mines before
+        # it, over the placements of the remaining cells and of the board
+        back = {(): gains}
+        probabilities = dict()
+        for p in reversed(range(len(self.cells))):
+            previous = dict()
+            weights = [0.0, 0.0]
+            for state, steps in self.moves[p].items():
+                poly = self.layers[p][state]
+                weight = [0.0] * len(poly)
+                for mine, after in steps:
+                    following = back[after]
+                    for k in range(len(poly)):
+                        weight[k] += following[k + mine]
+                    weights[mine] += sum(
+                        value * w for value, w in zip(poly, following[mine:])
+                    )
+                previous[state] = weight
+            total = weights[0] + weights[1]
+            probabilities[self.cells[p]] = weights[1] / total if total else 0.5
+            back = previous
+        return probabilities
+
+
+def component_gains(totals, weights):
+    """
+    Returns, for each polynomial in `totals`, which counts the placements
+    of one component by number of mines, the weight of each number of mines
+    k in it: the sum, over the placements of the other components with m
+    mines in all, of their number times weights[k + m].
+    Also returns the product of all of `totals`.
+    Components are multiplied in a balanced tree, and the weights passed
+    down it, so that no product is computed more than once.
+    """
+    products = dict()
+    gains = [None] * len(totals)
+
+    def multiply(lo, hi):
+        if hi - lo == 1:
+            result = totals[lo]
+        else:
+            mid = (lo + hi) // 2
+            result = normalize(convolve(multiply(lo, mid), multiply(mid, hi)))
+        products[lo, hi] = result
+        return result
+
+    def split(lo, hi, outer):
+        if hi - lo == 1:
+            gains[lo] = outer
+            return
+        mid = (lo + hi) // 2
+        split(lo, mid, normalize(correlate(products[mid, hi], outer)))
+        split(mid, hi, normalize(correlate(products[lo, mid], outer)))
+
+    if not totals:
+        return gains, [1.0]
+    placements = multiply(0, len(totals))
+    split(0, len(totals), weights)
+    return gains, placements
+
+
+def add_poly(target, poly, shift=0):
+    """Adds `poly`, multiplied by x ** `shift`, to `target` in place."""
+    if len(target) < len(poly) + shift:
+        target.extend([0] * (len(poly) + shift - len(target)))
+    for k, value in enumerate(poly):
+        target[k + shift] += value
+
+
+def normalize(poly):
+    """Returns `poly` divided by its largest coefficient."""
+    top = max(poly, default=0)
+    return [value / top for value in poly] if top else poly
+
+
+def convolve(a, b):
+    """Returns the product of two polynomials, as lists of coefficients."""
+    if not a or not b:
+        return []
+    if np is not None and len(a) * len(b) > 256:
+        return np.convolve(a, b).tolist()
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                result[i + j] += x * y
+    return result
+
+
+def correlate(a, b):
+    """
+    Returns the list whose kth item is the sum of a[m] * b[k + m] over m,
+    for every k where b[k + m] is defined for all m.
+    """
+    if np is not None and len(a) * len(b) > 256:
+        return np.correlate(b, a, "valid").tolist()
+    return [
+        sum(x * y for x, y in zip(a, b[k:]))
+        for k in range(len(b) - len(a) + 1)
+    ]
+
+
+def forced_cells(sentences):
+    """
+    Returns (safes, mines): every cell that `sentences` force to be safe or
+    a mine, as read off their constraint matrix once row-reduced.
+
+    Each sentence is a row with a 1 for each of its cells, equal to its
+    count. Rows are reduced with integer arithmetic, so that every row of
+    the result is an exact consequence of the sentences, and each is then
+    checked against the bounds of its cells, which are 0 or 1.
+    """
+    # Columns in the order cells first appear, which keeps rows of nearby
+    # sentences from filling in
+    order = dict()
+    for sentence in sentences:
+        for cell in sentence.cells:
+            order.setdefault(cell, len(order))
+
+    # Reduced rows, as ({cell: coefficient}, constant), by pivot cell; no
+    # pivot cell appears in any row but its own
+    pivots = dict()
+    for sentence in sentences:
+        row = (dict.fromkeys(sentence.cells, 1), sentence.count)
+        for cell in [cell for cell in row[0] if cell in pivots]:
+            row = eliminate(row, pivots[cell], cell)
+        if not row[0]:
+            continue
+        pivot = min(row[0], key=order.get)
+        if row[0][pivot] < 0:
+            row = ({cell: -value for cell, value in row[0].items()}, -row[1])
+        for cell, other in pivots.items():
+            if pivot in other[0]:
+                pivots[cell] = eliminate(other, row, pivot)
+        pivots[pivot] = row
+
+    safes = set()
+    mines = set()
+    for coefficients, constant in pivots.values():
+        bound_check(coefficients, constant, safes, mines)
+    return safes, mines
+
+
+def eliminate(row, pivot, cell):
+    """
+    Returns `row` less a multiple of `pivot` that cancels `cell`, scaled to
+    integers with no common factor.
+    """
+    coefficients, constant = row
+    pivot_coefficients, pivot_constant = pivot
+    factor = coefficients[cell]
+    scale = pivot_coefficients[cell]
+    result = {c: value * scale for c, value in coefficients.items()}
+    for c, value in pivot_coefficients.items():
+        value = result.get(c, 0) - value * factor
+        if value:
+            result[c] = value
+        else:
+            result.pop(c, None)
+    constant = constant * scale - pivot_constant * factor
+    divisor = math.gcd(constant, *result.values())
+    if divisor > 1:
+        result = {c: value // divisor for c, value in result.items()}
+        constant //= divisor
+    return result, constant
+
+
+def bound_check(coefficients, constant, safes, mines):
+    """
+    Adds to `safes` and `mines` the cells that the equation
+    sum(coefficient * cell) == constant, over cells that are 0 or 1, forces
+    to be 0 or 1: those for which the other value would put `constant`
+    out of reach of the rest of the equation.
+    """
+    low = sum(value for value in coefficients.values() if value < 0)
+    high = sum(value for value in coefficients.values() if value > 0)
+    if not low <= constant <= high:
+        return
+    for cell, value in coefficients.items():
+        # Reach of the other cells alone
+        rest_low = low - min(value, 0)
+        rest_high = high - max(value, 0)
+        if not rest_low <= constant <= rest_high:
+            mines.add(cell)
+        elif not rest_low <= constant - value <= rest_high:
+            safes.add(cell)
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, seed=None, verbose=True,
+                 mines=None, linear=False):
 
         # Set initial height and width
         self.height = height
         self.width = width
         self.count = 0
 
+        # Number of mines on the board, if known, used to weigh guesses
+        self.total_mines = mines
+
+        # Whether to deduce by row-reducing the knowledge base, in batches,
+        # rather than by comparing sentences in pairs
+        self.linear = linear
+
+        # Moves are chosen by a generator seeded with `seed`, if given,
+        # and reasoning is printed only if `verbose`
+        self.random = random if seed is None else random.Random(seed)
+        self.verbose = verbose
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
-        # A set of safe moves
+        # A set of safe moves, also kept as a list to pick from at random
         self.safe_moves = set()
+        self.safe_list = []
 
         # Keep track of cells known to be safe or mines
         self.mines = set()
@@ -163,23 +582,99 @@ class MinesweeperAI():
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # Index of the sentences in the knowledge base containing each cell,
+        # and the position of each sentence in the knowledge list
+        self.cell_sentences = dict()
+        self.positions = dict()
+
+        # Sentences that are new or changed since last inferred from
+        self.worklist = deque()
+
+        # Sentences left for the next row reduction, with linear deduction
+        self.pending = set()
+
+        # Frontier components counted for the last guess, by their sentences,
+        # so that components left unchanged since are not counted again
+        self.components = dict()
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        # No sentence contains the cell afterwards, so its entry goes
+        for sentence in self.cell_sentences.pop(cell, ()):
+            self.replace_sentence(sentence, sentence.without(cell, mine=True))
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
-        self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        if cell not in self.safes:
+            self.safes.add(cell)
+            if cell not in self.moves_made:
+                self.safe_moves.add(cell)
+                self.safe_list.append(cell)
+        for sentence in self.cell_sentences.pop(cell, ()):
+            self.replace_sentence(sentence, sentence.without(cell, mine=False))
+
+    def replace_sentence(self, sentence, new):
+        """
+        Replaces a sentence, from which a marked cell was just removed from
+        the index, by `new`, the same sentence without that cell, and queues
+        it for inference. If `new` is known already, the sentence is removed.
+        """
+        if new in self.positions:
+            self.remove_sentence(sentence)
+            return
+        position = self.positions.pop(sentence)
+        self.positions[new] = position
+        self.knowledge[position] = new
+        for cell in new.cells:
+            sentences = self.cell_sentences[cell]
+            sentences.discard(sentence)
+            sentences.add(new)
+        self.worklist.append(new)
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base, to the index of each
+        of its cells, and to the worklist.
+        Returns False if an equal sentence is known already.
+        """
+        if sentence in self.positions:
+            return False
+        self.positions[sentence] = len(self.knowledge)
+        self.knowledge.append(sentence)
+        for cell in sentence.cells:
+            self.cell_sentences.setdefault(cell, set()).add(sentence)
+        self.worklist.append(sentence)
+        return True
+
+    def remove_sentence(self, sentence):
+        """
+        Removes a sentence from the knowledge base, and from the index
+        of each of its cells.
+        """
+        # Move the last sentence into its place
+        position = self.positions.pop(sentence)
+        last = self.knowledge.pop()
+        if last is not sentence:
+            self.knowledge[position] = last
+            self.positions[last] = position
+
+        for cell in sentence.cells:
+            sentences = self.cell_sentences.get(cell)
+            if sentences is not None:
+                sentences.discard(sentence)
+                if not sentences:
+                    del self.cell_sentences[cell]
+
+    def known(self, sentence):
+        """Returns True if `sentence` is in the knowledge base."""
+        return sentence in self.positions
 
     def add_knowledge(self, cell, count):
         """
@@ -198,6 +693,7 @@ class MinesweeperAI():
         """
         self.count += 1
         self.moves_made.add(cell)
+        self.safe_moves.discard(cell)
         self.mark_safe(cell)
 
         nearby = set()
@@ -216,78 +712,123 @@ class MinesweeperAI():
                     if 0 <= i < self.height and 0 <= j < self.width:               
                         nearby.add((i,j))
 
-        print("\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n")
-        new_sentence = Sentence(nearby, count)
-        if new_sentence not in self.knowledge:
-            self.knowledge.append(new_sentence)
+        if self.verbose:
+            print("\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n\n")
+        self.add_sentence(BitSentence(nearby, count, self.width))
         self.knowledge_organize()
-        self.safe_moves = self.safes - self.moves_made
-        self.debuggy()
+        if self.verbose:
+            self.debuggy()
 
     def knowledge_organize(self):
         """
-        Cleaning up the knowledge base
+        Cleaning up the knowledge base, one sentence from the worklist
+        at a time, until no sentence is new or changed:
         1) Removes empty sentences
-        2) Sort sentences with no mines
-        3) Sort sentences full of mines
-        4) Restructure sentences that are subsets of another
-        Loops until no changes are made to the knowledgebase,
+        2) Marks cells of sentences with no mines as safe
+        3) Marks cells of sentences full of mines as mines
+        4) Restructures sentences that are subsets of another
+        Each change queues the sentences it touches,
             because each change might enable a new change
+        With linear deduction, sentences are set aside instead of 4), and
+        row-reduced together whenever the worklist runs out
         """
-        change = True
         calculating = "Calculating"
-        # Keeps looping until no changes are made to KB
-        while change == True:
+        while self.worklist or self.pending:
+            if not self.worklist:
+                self.linear_deduction()
+                continue
+            sentence = self.worklist.popleft()
+            if not self.known(sentence):
+                continue
             calculating += "."
-            print(calculating)
-            change = False
-            for sentence in self.knowledge:
-                # Remove empty sentences
-                if not sentence.cells:
-                    self.knowledge.remove(sentence)
-                    change = True
-                    break
-                # Mark safe cells
-                safes = Sentence.known_safes(sentence)
-                if safes:
-                    change = True
-                    for safe in list(safes):
-                        self.mark_safe(safe)    
-                    break
-                # Mark mines
-                mines = Sentence.known_mines(sentence)
-                if mines:
-                    change = True
-                    for mine in list(mines):
-                        self.mark_mine(mine)
-                    break   
-
-            # Handle simple calculations before inference calculations
-            if change == True:
+            if self.verbose:
+                print(calculating)
+
+            # Remove empty sentences
+            if not len(sentence):
+                self.remove_sentence(sentence)
+                continue
+            # Mark safe cells
+            safes = sentence.known_safes()
+            if safes:
+                for safe in list(safes):
+                    self.mark_safe(safe)
                 continue
-            change = self.inference()                
+            # Mark mines
+            mines = sentence.known_mines()
+            if mines:
+                for mine in list(mines):
+                    self.mark_mine(mine)
+                continue
+
+            if self.linear:
+                self.pending.add(sentence)
+            else:
+                self.inference(sentence)
+
+    def linear_deduction(self):
+        """
+        Row-reduces the sentences connected to those pending, and marks
+        every cell they force to be safe or a mine at once.
+        """
+        sentences = self.connected_sentences(
+            sentence for sentence in self.pending if self.known(sentence)
+        )
+        self.pending.clear()
+        safes, mines = forced_cells(sentences)
+        if self.verbose:
+            print(f"\n~~linear deduction~~\n{len(sentences)} sentences"
+                  f" >>> {len(safes)} safe, {len(mines)} mines\n")
+        for safe in safes:
+            self.mark_safe(safe)
+        for mine in mines:
+            self.mark_mine(mine)
+
+    def connected_sentences(self, sentences):
+        """
+        Returns the sentences in the knowledge base linked to `sentences`
+        by shared cells, breadth first from them.
+        """
+        found = list(sentences)
+        seen = set(found)
+        for sentence in found:
+            for cell in sentence.cells:
+                for other in self.cell_sentences[cell]:
+                    if other not in seen:
+                        seen.add(other)
+                        found.append(other)
+        return found
 
-    def inference(self):
-        """        
+    def inference(self, sentence):
+        """
+        Compares `sentence` with every sentence sharing a cell with it.
         If a set is a subset of another,
         Subtract the cells and count from the superset
         """
-        for pair in itertools.combinations(self.knowledge, 2):
-            if pair[0].cells.issubset(pair[1].cells):
-                new = pair[1] - pair[0]
-                print(f"\n~~inference~~\n{pair[0]}\n{pair[1]}\n>>>new\n{new}\n")
-                self.knowledge.remove(pair[1])
-                self.knowledge.append(new)
-                return True
-            elif pair[1].cells.issubset(pair[0].cells):
-                new = pair[0] - pair[1]
-                print(f"\n~~inference~~\n{pair[1]}\n{pair[0]}\n>>>new\n{new}\n")
-                self.knowledge.remove(pair[0])
-                self.knowledge.append(new)
-                return True
-            
-        return False
-                
+        others = set()
+        for cell in sentence.cells:
+            others.update(self.cell_sentences[cell])
+        others.discard(sentence)
+
+        for other in others:
+            if not self.known(other):
+                continue
+            if len(sentence) < len(other):
+                subset, superset = sentence, other
+            elif len(other) < len(sentence):
+                subset, superset = other, sentence
+            else:
+                continue
+            if not subset.issubset(superset):
+                continue
+
+            new = superset - subset
+            if self.verbose:
+                print(f"\n~~inference~~\n{subset}\n{superset}\n>>>new\n{new}\n")
+            self.remove_sentence(superset)
+            self.add_sentence(new)
+            if superset is sentence:
+                return
 
     def debuggy(self):
         """
@@ -318,8 +859,15 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        if self.safe_moves:
-            return random.choice(list(self.safe_moves))
+        # Pick at random from the list, dropping any cell played since
+        # it was found safe by swapping the last cell into its place
+        while self.safe_list:
+            k = self.random.randrange(len(self.safe_list))
+            cell = self.safe_list[k]
+            if cell in self.safe_moves:
+                return cell
+            self.safe_list[k] = self.safe_list[-1]
+            self.safe_list.pop()
         return None
     
     def make_random_move(self):
@@ -328,9 +876,154 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        If the number of mines is known, the choice is among the cells
+        least likely to be mines instead, per mine_probabilities.
         """
-        while True:
-            i = random.randint(0, 7)
-            j = random.randint(0, 7)
-            if (i, j) not in (self.moves_made, self.mines):
-                return (i, j)
+        if self.total_mines is not None:
+            frontier, interior = self.mine_probabilities()
+            best = min(frontier.values(), default=1.0)
+            # Prefer the frontier when it is as safe, as revealing it
+            # tells more about the cells already constrained
+            if interior is not None and interior < best - 1e-9:
+                return self.random_interior_cell()
+            if frontier:
+                return self.random.choice(sorted(
+                    cell for cell, p in frontier.items() if p <= best + 1e-9
+                ))
+
+        choices = [
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if (i, j) not in self.moves_made and (i, j) not in self.mines
+        ]
+        if not choices:
+            return None
+        return self.random.choice(choices)
+
+    def random_interior_cell(self):
+        """
+        Returns a random unknown cell in no sentence of the knowledge base.
+        """
+        def interior(cell):
+            return (
+                cell not in self.moves_made and cell not in self.mines
+                and cell not in self.safes and cell not in self.cell_sentences
+            )
+
+        # Try a few cells at random before listing them all, as most of a
+        # big board is interior whenever there are guesses to make
+        for _ in range(32):
+            cell = (
+                self.random.randrange(self.height),
+                self.random.randrange(self.width)
+            )
+            if interior(cell):
+                return cell
+        return self.random.choice([
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if interior((i, j))
+        ])
+
+    def frontier_components(self):
+        """
+        Returns the frontier, the unknown cells in some sentence, split into
+        components that share no sentence, as (cells, sentences) pairs.
+        Cells are listed breadth first, so that the cells of a sentence are
+        close together in the list.
+        """
+        components = []
+        seen = set()
+        for start in self.cell_sentences:
+            if start in seen:
+                continue
+            seen.add(start)
+            cells = []
+            sentences = set()
+            queue = deque([start])
+            while queue:
+                cell = queue.popleft()
+                cells.append(cell)
+                for sentence in self.cell_sentences[cell]:
+                    if sentence in sentences:
+                        continue
+                    sentences.add(sentence)
+                    for other in sentence.cells:
+                        if other not in seen:
+                            seen.add(other)
+                            queue.append(other)
+            components.append((cells, sentences))
+        return components
+
+    def mine_probabilities(self):
+        """
+        Returns the probability that each unknown cell is a mine, taking
+        every placement of the mines left that agrees with the knowledge
+        base to be equally likely. Requires the number of mines.
+        Returns (frontier, interior): a dict of the probability of each cell
+        in some sentence, and the probability of any other unknown cell, or
+        None if there are no other unknown cells.
+        """
+        remaining = self.total_mines - len(self.mines)
+        unknown = (
+            self.height * self.width - len(self.moves_made)
+            - len(self.safe_moves) - len(self.mines)
+        )
+        interior = unknown - len(self.cell_sentences)
+
+        # Count the placements of each component by its number of mines
+        frontier = dict()
+        components = []
+        cache = dict()
+        for cells, sentences in self.frontier_components():
+            key = frozenset(sentences)
+            component = self.components.get(key)
+            if component is None:
+                component = FrontierComponent(cells, sentences)
+            cache[key] = component
+            if component.totals is None:
+                # Too many placements to count: estimate each cell by its
+                # densest sentence, and leave the component's mines aside
+                for cell in cells:
+                    frontier[cell] = max(
+                        sentence.count / len(sentence)
+                        for sentence in self.cell_sentences[cell]
+                    )
+                remaining -= round(sum(frontier[cell] for cell in cells))
+                continue
+            components.append(component)
+        self.components = cache
+        totals = [component.totals for component in components]
+
+        # Placements of the frontier with `k` mines leave the rest to the
+        # interior, in comb(interior, remaining - k) ways
+        span = sum(len(total) - 1 for total in totals) + 1
+        logs = [
+            math.lgamma(interior + 1) - math.lgamma(remaining - k + 1)
+            - math.lgamma(interior - remaining + k + 1)
+            if 0 <= remaining - k <= interior else None
+            for k in range(span)
+        ]
+        top = max((w for w in logs if w is not None), default=None)
+        if top is None:
+            # The mine count disagrees with the estimates, so ignore it
+            weights = [1.0] * span
+        else:
+            weights = [0.0 if w is None else math.exp(w - top) for w in logs]
+
+        gains, placements = component_gains(totals, weights)
+        for component, weight in zip(components, gains):
+            frontier.update(component.probabilities(weight))
+
+        if interior <= 0:
+            return frontier, None
+        norm = sum(p * w for p, w in zip(placements, weights))
+        expected = sum(
+            p * w * (remaining - k)
+            for k, (p, w) in enumerate(zip(placements, weights))
+        )
+        probability = expected / norm / interior if norm else 0.5
+        return frontier, min(max(probability, 0.0), 1.0)
@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+from multiprocessing import Pool
+
+# Totals kept for every batch of games, summed across workers
+TOTALS = ("games", "wins", "moves", "guesses", "seconds")
+
+
+def main():
+
+    # Parse command-line arguments
+    parser = argparse.ArgumentParser(
+        description="Play Minesweeper games with the AI, without a display."
+    )
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    mines = parser.add_mutually_exclusive_group()
+    mines.add_argument("--mines", type=int, help="number of mines (default 8)")
+    mines.add_argument(
+        "--density", type=float, help="fraction of cells that are mines"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="seed of the first game; game k uses seed + k"
+    )
+    parser.add_argument(
+        "--workers", type=int,
+        help="number of worker processes (default: one per core)"
+    )
+    parser.add_argument(
+        "--linear", action="store_true",
+        help="deduce by row-reducing the knowledge base"
+    )
+    parser.add_argument(
+        "--json", action="store_true", help="print the summary as JSON"
+    )
+    args = parser.parse_args()
+
+    if args.density is not None:
+        mines = round(args.density * args.height * args.width)
+    else:
+        mines = 8 if args.mines is None else args.mines
+    if not 0 <= mines < args.height * args.width:
+        parser.error("there must be at least one cell without a mine")
+
+    start = time.perf_counter()
+    totals = simulate(
+        args.games, args.height, args.width, mines, args.seed, args.workers,
+        args.linear
+    )
+    summary = summarize(totals, time.perf_counter() - start)
+    summary.update(
+        height=args.height, width=args.width, mines=mines, seed=args.seed,
+        linear=args.linear
+    )
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"Board: {args.height}x{args.width} with {mines} mines")
+        print(f"Games: {summary['games']}")
+        print(f"Win rate: {summary['win_rate']:.2%}")
+        print(f"Moves per game: {summary['moves_per_game']:.2f}")
+        print(f"Guesses per game: {summary['guesses_per_game']:.2f}")
+        print(f"Time per move: {summary['seconds_per_move'] * 1e6:.1f} us")
+        print(f"Games per second: {summary['games_per_second']:.1f}")
+
+
+def simulate(games, height, width, mines, seed=0, workers=None,
+             linear=False):
+    """
+    Play `games` games across a pool of `workers` processes, in batches
+    of consecutive seeds. Return the totals of TOTALS over every game.
+    """
+    workers = workers or os.cpu_count() or 1
+    size = max(1, min(1000, games // (workers * 8)))
+    batches = [
+        (height, width, mines, first, min(size, seed + games - first),
+         linear)
+        for first in range(seed, seed + games, size)
+    ]
+    totals = dict.fromkeys(TOTALS, 0)
+    with Pool(workers) as pool:
+        for batch in pool.imap_unordered(play_batch, batches):
+            for key in TOTALS:
+                totals[key] += batch[key]
+    return totals
+
+
+def play_batch(batch):
+    """
+    Play `count` games with seeds from `first`, and return their totals.
+    """
+    height, width, mines, first, count, linear = batch
+    totals = dict.fromkeys(TOTALS, 0)
+    for seed in range(first, first + count):
+        won, moves, guesses, seconds = play_game(
+            height, width, mines, seed, linear
+        )
+        totals["games"] += 1
+        totals["wins"] += won
+        totals["moves"] += moves
+        totals["guesses"] += guesses
+        totals["seconds"] += seconds
+    return totals
+
+
+def play_game(height, width, mines, seed, linear=False):
+    """
+    Play one game, as the AI button of runner.py does: a known safe move
+    if there is one, and otherwise the least risky guess.
+    The game is won once every cell without a mine is revealed.
+    Return (won, moves, guesses, seconds), where seconds is the time the AI
+    spent choosing moves and adding knowledge.
+    """
+    game = Minesweeper(
+        height=height, width=width, mines=mines, seed=f"{seed}:board"
+    )
+    ai = MinesweeperAI(
+        height=height, width=width, seed=f"{seed}:ai", verbose=False,
+        mines=mines, linear=linear
+    )
+    safe_cells = height * width - mines
+
+    revealed = 0
+    moves = 0
+    guesses = 0
+    seconds = 0.0
+    while revealed < safe_cells:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+            guesses += 1
+        seconds += time.perf_counter() - start
+        if move is None:
+            break
+
+        moves += 1
+        if game.is_mine(move):
+            return False, moves, guesses, seconds
+
+        start = time.perf_counter()
+        ai.add_knowledge(move, game.nearby_mines(move))
+        seconds += time.perf_counter() - start
+        revealed += 1
+
+    return revealed == safe_cells, moves, guesses, seconds
+
+
+def summarize(totals, elapsed):
+    """Return aggregate statistics of simulation totals."""
+    games = totals["games"]
+    moves = totals["moves"]
+    return dict(
+        games=games,
+        wins=totals["wins"],
+        win_rate=totals["wins"] / games if games else 0.0,
+        moves_per_game=moves / games if games else 0.0,
+        guesses_per_game=totals["guesses"] / games if games else 0.0,
+        seconds_per_move=totals["seconds"] / moves if moves else 0.0,
+        games_per_second=games / elapsed if elapsed else 0.0,
+        elapsed_seconds=elapsed
+    )
+
+
+if __name__ == "__main__":
+    main()